@@ -24,23 +24,46 @@ mislabel centuries-old people as living.
 
 Usage:
     python anonymize_gedcom.py <input.ged> [output] [options]
+    python anonymize_gedcom.py --batch <directory | manifest> [outdir] [--jobs N] [options]
 
 If no output path is given, writes "<input>.anon.ged" next to the input.
 When the output path ends in `.js`, the result is wrapped as
-`window.<VAR>="...";` (for default_data.js). No external dependencies.
+`window.<VAR>="...";`. With `--cache PATH`, parsed records and birth-year
+estimates are kept between runs, so regenerating after a small edit only
+reparses the changed records. `--compact PATH` also writes the viewer's
+pre-indexed form of the result (string table, integer ids, typed arrays),
+which index.html loads without parsing. The bundled sample, default_data.js,
+is in that form (window.DEFAULT_GED_COMPACT); regenerate it with
+
+    python anonymize_gedcom.py tree.ged tree.anon.ged --compact default_data.js
+
+No external dependencies.
 """
 
 import argparse
+import base64
+import concurrent.futures
 import datetime
+import hashlib
+import heapq
 import json
 import os
+import pickle
 import re
 import sys
+import time
 import statistics
+from array import array
 
 YEAR_RE = re.compile(r"\d{3,4}")
 LETTER_RE = re.compile(r"[^\W\d_]", re.UNICODE)  # first alphabetic char (Unicode-aware)
 SURN_SLASH_RE = re.compile(r"/([^/]*)/")
+LEVELS = {str(n): n for n in range(100)}  # level token -> int, for the usual spellings
+# JavaScript's \s, for mirroring the viewer's parser (see CompactIndex).
+JS_SPACE = ("\t\n\v\f\r \xa0\u1680\u2000\u2001\u2002\u2003\u2004\u2005\u2006\u2007"
+            "\u2008\u2009\u200a\u2028\u2029\u202f\u205f\u3000\ufeff")
+JS_SPACE_RE = re.compile("[%s]+" % JS_SPACE)
+NO_YEAR = -32768  # "no year" in the compact output's Int16 columns
 
 # Level-1 tags whose level-2 DATE does NOT mean "alive then" (CHAN = edit date, etc.).
 IGNORE_L1_FOR_ALIVE = {
@@ -111,22 +134,63 @@ class Family:
         self.marr_year = None
 
 
-def parse(text):
-    lines = text.lstrip("﻿").splitlines()
+def iter_lines(source):
+    """Lines of `source` -- a str, or an iterable of text lines such as an open
+    file -- split exactly as str.splitlines() splits the whole text, with a
+    leading byte-order mark dropped. Iterables are consumed lazily."""
+    if isinstance(source, str):
+        yield from source.lstrip("﻿").splitlines()
+        return
+    first = True
+    for chunk in source:
+        if first:
+            chunk = chunk.lstrip("﻿")
+            first = False
+        # A file only breaks lines at \n / \r; splitlines() also breaks at
+        # \x0b, \x1c, \u2028, ... -- split again so both inputs agree.
+        yield from chunk.splitlines()
+
+
+def tokens(lines):
+    """split_line over `lines`, skipping blank and malformed lines, with the
+    usual "<level> [@xref@ ]<tag>[ <value>]" line cut by str.partition in
+    place of split_line's split() lists and int() -- the same fields, at a
+    fraction of the cost (see bench_anonymize.py)."""
+    levels = LEVELS
+    for line in lines:
+        if not line:
+            continue
+        lv, sep, rest = line.partition(" ")
+        level = levels.get(lv) if sep else None
+        if level is None:                # "+1", " 1", "01", no space, ...
+            p = split_line(line)
+            if p:
+                yield p
+            continue
+        if rest.startswith("@"):
+            xref, _, rest = rest.partition(" ")
+        else:
+            xref = None
+        tag, _, value = rest.partition(" ")
+        yield level, tag, value, xref
+
+
+def parse(source):
+    """Parse GEDCOM text or a line iterable (see iter_lines) in one pass.
+
+    Returns (indis, fams, order): xref -> Individual, xref -> Family, and
+    the ("I" | "F", xref) record order of the file.
+    """
+    lines = iter_lines(source)
     indis, fams, order = {}, {}, []
     rec = None
     kind = None
     l1 = None
     cur_name = None
 
-    for raw in lines:
-        line = raw.rstrip("\r\n")
-        if not line:
-            continue
-        p = split_line(line)
-        if not p:
-            continue
-        level, tag, value, xref = p
+    for level, tag, value, xref in tokens(lines):
+        if level > 2:
+            continue   # citation details (e.g. SOUR/DATA/DATE) are ignored on purpose
 
         if level == 0:
             rec = kind = l1 = cur_name = None
@@ -177,7 +241,6 @@ def parse(text):
                                 rec.death_year = y
                         elif l1 not in IGNORE_L1_FOR_ALIVE:
                             rec.alive_years.append(y)
-            # level >= 3 (e.g. SOUR/DATA/DATE citation dates) is ignored on purpose.
         else:  # FAM
             if level == 1:
                 l1 = tag
@@ -195,40 +258,78 @@ def parse(text):
     return indis, fams, order
 
 
-def estimate_birth_years(indis, fams, gen_gap):
-    ADULT_GAP = 25  # assumed age at a recorded adult life event / marriage
+def _csr(n_rows, pairs):
+    """Compressed rows from (row, value) pairs: row r's values, in pair order,
+    are items[start[r]:start[r + 1]]."""
+    start = array("i", [0]) * (n_rows + 1)
+    for r, _ in pairs:
+        start[r + 1] += 1
+    for r in range(n_rows):
+        start[r + 1] += start[r]
+    fill = start[:-1]
+    items = array("i", [0]) * len(pairs)
+    for r, v in pairs:
+        items[fill[r]] = v
+        fill[r] += 1
+    return start, items
 
-    parents, children, spouses, siblings = {}, {}, {}, {}
 
-    def push(m, k, v):
-        if v:
-            m.setdefault(k, []).append(v)
+def estimate_birth_years(indis, fams, gen_gap):
+    ADULT_GAP = 25  # assumed age at a recorded adult life event / marriage
 
-    for fam in fams.values():
-        pair = [x for x in (fam.husb, fam.wife) if x]
-        for c in fam.chil:
-            for par in pair:
-                push(parents, c, par)
-                push(children, par, c)
-        if fam.husb and fam.wife:
-            push(spouses, fam.husb, fam.wife)
-            push(spouses, fam.wife, fam.husb)
+    # People are numbered by file order and families by their own order.
+    # Family f has parents husb[f] / wife[f] (-1 if absent or not an INDI) and
+    # children kids[kid_at[f]:kid_at[f + 1]]; each person lists the families
+    # they are a child in (once per CHIL line) and a spouse in (once per role).
+    # Siblings are reached through the shared family rather than stored pairwise.
+    ids = list(indis)
+    pos = {rid: i for i, rid in enumerate(ids)}
+    n = len(ids)
+    husb, wife = array("i"), array("i")
+    kid_of, child_in, spouse_in = [], [], []
+    married = {}  # person -> earliest marriage year, evidence of adulthood
+    for f, fam in enumerate(fams.values()):
+        h, w = pos.get(fam.husb, -1), pos.get(fam.wife, -1)
+        husb.append(h)
+        wife.append(w)
         for c in fam.chil:
-            for c2 in fam.chil:
-                if c != c2:
-                    push(siblings, c, c2)
-        if fam.marr_year is not None:
-            for s in pair:
-                ind = indis.get(s)
-                if ind:
-                    ind.alive_years.append(fam.marr_year)
+            ci = pos.get(c)
+            if ci is not None:
+                kid_of.append((f, ci))
+                child_in.append((ci, f))
+        for s in (h, w):
+            if s >= 0:
+                spouse_in.append((s, f))
+                if fam.marr_year is not None:
+                    married[s] = min(married.get(s, fam.marr_year), fam.marr_year)
+    kid_at, kids = _csr(len(husb), kid_of)
+    child_at, child_fams = _csr(n, child_in)
+    spouse_at, spouse_fams = _csr(n, spouse_in)
+    del kid_of, child_in, spouse_in
+
+    def links(x):
+        # (neighbour, delta): a known neighbour suggests year[neighbour] + delta.
+        for f in child_fams[child_at[x]:child_at[x + 1]]:
+            for par in (husb[f], wife[f]):
+                if par >= 0:
+                    yield par, gen_gap
+            for k in kids[kid_at[f]:kid_at[f + 1]]:
+                if k != x:
+                    yield k, 0
+        for f in spouse_fams[spouse_at[x]:spouse_at[x + 1]]:
+            for k in kids[kid_at[f]:kid_at[f + 1]]:
+                yield k, -gen_gap
+            other = wife[f] if husb[f] == x else husb[f]
+            if other >= 0:
+                yield other, 0
 
     def median(arr):
         return int(round(statistics.median(arr)))
 
     # Seed with own hard evidence.
-    est = {}  # id -> (year, direct)
-    for ind in indis.values():
+    year = [None] * n
+    direct = bytearray(n)
+    for i, ind in enumerate(indis.values()):
         y = None
         if ind.birth_year is not None:
             y = ind.birth_year
@@ -236,45 +337,275 @@ def estimate_birth_years(indis, fams, gen_gap):
             y = ind.chr_year                     # christened ~ at birth
         elif ind.death_year is not None:
             y = ind.death_year - 40              # rough: born well before death
-        elif ind.alive_years:
-            y = min(ind.alive_years) - ADULT_GAP
+        elif ind.alive_years or i in married:
+            adult = ind.alive_years + [married[i]] if i in married else ind.alive_years
+            y = min(adult) - ADULT_GAP
         if y is not None:
-            est[ind.id] = (y, True)
-
-    # Fixpoint: fill unknowns from neighbours until nothing new appears.
-    changed, rounds = True, 0
-    while changed and rounds < 100:
-        changed = False
-        rounds += 1
-        for ind in indis.values():
-            if ind.id in est:
+            year[i] = y
+            direct[i] = 1
+
+    # Fill unknowns from neighbours. The result is that of sweeping over
+    # `indis` in file order until nothing changes, each unknown person taking
+    # the median of the neighbours known when the sweep reaches them -- but
+    # only people next to a newly estimated one are ever visited: a heap keyed
+    # on (sweep, position) replays the estimates in the order sweeps make them.
+    queue, due = [], {}   # due: earliest (sweep, position) queued per person
+
+    def wake(x, sweep):
+        # A neighbour after `x` is reached later in this sweep, one before it
+        # only in the next.
+        for nb, _ in links(x):
+            if year[nb] is not None:
                 continue
-            cand = []
-            for c in children.get(ind.id, ()):
-                if c in est:
-                    cand.append(est[c][0] - gen_gap)
-            for par in parents.get(ind.id, ()):
-                if par in est:
-                    cand.append(est[par][0] + gen_gap)
-            for s in spouses.get(ind.id, ()):
-                if s in est:
-                    cand.append(est[s][0])
-            for sib in siblings.get(ind.id, ()):
-                if sib in est:
-                    cand.append(est[sib][0])
-            if cand:
-                est[ind.id] = (median(cand), False)
-                changed = True
+            key = (sweep if nb > x else sweep + 1, nb)
+            if key < due.get(nb, (sweep + 2, 0)):
+                due[nb] = key
+                heapq.heappush(queue, key)
+
+    for i in range(n):   # first sweep's frontier, already heap-ordered
+        if year[i] is None and any(year[nb] is not None for nb, _ in links(i)):
+            due[i] = (1, i)
+            queue.append((1, i))
+    while queue:
+        sweep, i = heapq.heappop(queue)
+        if year[i] is not None:
+            continue
+        year[i] = median([year[nb] + d for nb, d in links(i) if year[nb] is not None])
+        wake(i, sweep)
+    return {ids[i]: (y, bool(direct[i])) for i, y in enumerate(year) if y is not None}
+
+
+# Components are independent, so a large tree's estimation can be spread over
+# worker processes. They get the parsed tree once, when they start (inherited
+# where processes fork), and then only lists of xrefs. Opt-in (--jobs): finding
+# the components and sending the estimates back costs about as much as the
+# serial estimate, so it only pays with many CPUs and many mid-sized islands.
+SHARD_MIN_PEOPLE = 20000   # below this, starting workers costs more than it saves
+_shard_tree = None
+
+
+def _init_shard_worker(indis, fams, gen_gap):
+    global _shard_tree
+    _shard_tree = (indis, fams, gen_gap)
+
+
+def _estimate_shard(shard):
+    indis, fams, gen_gap = _shard_tree
+    est = {}
+    for members, fam_ids in shard:
+        est.update(estimate_birth_years({rid: indis[rid] for rid in members},
+                                        {fid: fams[fid] for fid in fam_ids}, gen_gap))
     return est
 
 
-def is_living(ind, est, year, max_age, assume_living):
-    if ind.has_death:
-        return False                              # has a death/burial record => not living
-    e = est.get(ind.id)
-    if e is None:
-        return assume_living                      # no evidence anywhere
-    return e[0] >= year - max_age                 # born within the window (inclusive)
+def estimate_sharded(indis, fams, gen_gap, jobs):
+    """estimate_birth_years, with the connected components (see components)
+    spread over `jobs` worker processes and merged back into one mapping --
+    the same estimates, as no estimate crosses a component. Small trees, and
+    trees of a single component, are estimated in-process; one giant island
+    still takes as long as it takes."""
+    if jobs <= 1 or len(indis) < SHARD_MIN_PEOPLE:
+        return estimate_birth_years(indis, fams, gen_gap)
+    comps = components(indis, fams)
+    if len(comps) < 2:
+        return estimate_birth_years(indis, fams, gen_gap)
+    # A few shards per worker; largest components first, each to the lightest shard.
+    shards = [[] for _ in range(min(len(comps), jobs * 4))]
+    loads = [(0, i) for i in range(len(shards))]
+    for comp in sorted(comps, key=lambda c: -len(c[0])):
+        load, i = heapq.heappop(loads)
+        shards[i].append(comp)
+        heapq.heappush(loads, (load + len(comp[0]) + len(comp[1]), i))
+    est = {}
+    with concurrent.futures.ProcessPoolExecutor(
+            min(jobs, len(shards)), initializer=_init_shard_worker,
+            initargs=(indis, fams, gen_gap)) as pool:
+        for part in pool.map(_estimate_shard, shards):
+            est.update(part)
+    return est
+
+
+# Incremental cache (--cache). Parse results are kept per piece of the file
+# and birth-year estimates per connected family group, so a rerun after a
+# small edit reparses only the changed pieces and re-estimates only the
+# groups they touch. Bump CACHE_VERSION whenever parsing or estimation
+# changes meaning.
+CACHE_VERSION = 1
+
+
+def split_records(f, chunk=1 << 20):
+    """(byte offset, bytes) of each piece of the GEDCOM file `f` (opened
+    "rb"), cut before every line that starts with "0 ". Such a line is
+    always a level-0 line, where parse() starts afresh, so parsing the
+    pieces one by one yields the same records as parsing the whole file.
+    Reads `chunk` bytes at a time; only the unfinished piece is kept."""
+    buf, start, scanned = b"", 0, 0
+    while True:
+        more = f.read(chunk)
+        buf += more
+        cut = 0
+        at = buf.find(b"\n0 ", scanned)
+        while at >= 0:
+            yield start + cut, buf[cut:at + 1]
+            cut = at + 1
+            at = buf.find(b"\n0 ", cut)
+        if not more:
+            if cut < len(buf):
+                yield start + cut, buf[cut:]
+            return
+        buf, start = buf[cut:], start + cut
+        scanned = max(0, len(buf) - 2)  # a "\n0 " may straddle the next read
+
+
+def _state(rec):
+    return tuple(getattr(rec, slot) for slot in rec.__slots__)
+
+
+def _restore(cls, state):
+    rec = cls.__new__(cls)
+    for slot, value in zip(cls.__slots__, state):
+        setattr(rec, slot, value)
+    return rec
+
+
+def parse_cached(f, cache):
+    """parse() the GEDCOM file `f` (opened "rb") piece by piece, reusing
+    the parse of every piece (see split_records) whose content hash is in
+    cache["records"]. Memory holds the records, not the file.
+
+    Leaves `cache` holding this file's pieces (as plain field tuples) and
+    cache["index"], ("I" | "F", xref) -> (byte offset, length, content hash)
+    of the piece holding that record. Returns (indis, fams, order, reparsed) with the
+    number of pieces parsed afresh.
+    """
+    old = cache.get("records", {})
+    records, index = {}, {}
+    indis, fams, order = {}, {}, []
+    reparsed = 0
+    for start, piece in split_records(f):
+        digest = hashlib.blake2b(piece, digest_size=16).digest()
+        states = records.get(digest, old.get(digest))
+        if states is None:
+            p_indis, p_fams, p_order = parse(piece.decode("utf-8"))
+            states = tuple((kind, rid, _state(p_indis[rid] if kind == "I" else p_fams[rid]))
+                           for kind, rid in p_order)
+            reparsed += 1
+        records[digest] = states
+        for kind, rid, state in states:
+            order.append((kind, rid))
+            index[kind, rid] = (start, len(piece), digest)
+            if kind == "I":
+                indis[rid] = _restore(Individual, state)
+            else:
+                fams[rid] = _restore(Family, state)
+    if reparsed or records.keys() != old.keys() or index != cache.get("index"):
+        cache["dirty"] = True
+    cache["records"], cache["index"] = records, index
+    return indis, fams, order, reparsed
+
+
+def components(indis, fams):
+    """Connected components of the family graph, as (person xrefs, family
+    xrefs) pairs, both in file order. Families naming no known person are
+    left out."""
+    root = {rid: rid for rid in indis}
+
+    def find(x):
+        while root[x] != x:
+            root[x] = x = root[root[x]]
+        return x
+
+    for fam in fams.values():
+        members = [x for x in (fam.husb, fam.wife, *fam.chil) if x in root]
+        for x in members[1:]:
+            a, b = find(members[0]), find(x)
+            if a != b:
+                root[b] = a
+    groups = {}
+    for rid in indis:
+        groups.setdefault(find(rid), ([], []))[0].append(rid)
+    for fid, fam in fams.items():
+        for x in (fam.husb, fam.wife, *fam.chil):
+            if x in root:
+                groups[find(x)][1].append(fid)
+                break
+    return list(groups.values())
+
+
+def estimate_cached(indis, fams, gen_gap, cache):
+    """estimate_birth_years one component at a time -- components never
+    influence each other -- reusing cache["estimates"] for components whose
+    records are unchanged (by the content hashes parse_cached left in
+    cache["index"]). Leaves `cache` holding this tree's components; returns
+    (est, reestimated)."""
+    old = cache.get("estimates", {})
+    index = cache["index"]
+    kept, est = {}, {}
+    reestimated = 0
+    for members, fam_ids in components(indis, fams):
+        # Members and families in order, each by xref and the hash of its piece.
+        key = hashlib.blake2b(repr((gen_gap, members, fam_ids)).encode(), digest_size=16)
+        key.update(b"".join(index["I", rid][2] for rid in members))
+        key.update(b"".join(index["F", fid][2] for fid in fam_ids))
+        key = key.digest()
+        part = old.get(key)
+        if part is None:
+            part = estimate_birth_years({rid: indis[rid] for rid in members},
+                                        {fid: fams[fid] for fid in fam_ids}, gen_gap)
+            reestimated += 1
+        kept[key] = part
+        est.update(part)
+    if reestimated or kept.keys() != old.keys():
+        cache["dirty"] = True
+    cache["estimates"] = kept
+    return est, reestimated
+
+
+def load_cache(path):
+    try:
+        with open(path, "rb") as f:
+            cache = pickle.load(f)
+    except FileNotFoundError:
+        cache = None
+    except Exception as e:  # unreadable or from another version: start over
+        sys.stderr.write("Ignoring cache %s (%s).\n" % (path, e))
+        cache = None
+    if not isinstance(cache, dict) or cache.get("version") != CACHE_VERSION:
+        cache = {"version": CACHE_VERSION}
+    return cache
+
+
+def save_cache(path, cache):
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        pickle.dump(cache, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+
+
+def living_status(indis, est, opts):
+    """Decide once who is living. Returns (living, counts): a bytearray with
+    1 for each living person, in `indis` order, and how many people were
+    settled by a death record ("death"), by a known or estimated birth year
+    ("dated") or by --assume-living for want of evidence ("undated"), plus
+    the "living" total."""
+    living = bytearray(len(indis))
+    counts = {"living": 0, "death": 0, "dated": 0, "undated": 0}
+    cutoff = opts.year - opts.max_age
+    for i, ind in enumerate(indis.values()):
+        if ind.has_death:
+            counts["death"] += 1                  # has a death/burial record => not living
+            continue
+        e = est.get(ind.id)
+        if e is None:
+            counts["undated"] += 1
+            alive = opts.assume_living            # no evidence anywhere
+        else:
+            counts["dated"] += 1
+            alive = e[0] >= cutoff                # born within the window (inclusive)
+        if alive:
+            living[i] = 1
+            counts["living"] += 1
+    return living, counts
 
 
 def initials(name_text):
@@ -300,66 +631,456 @@ def surname_of(name):
     return None
 
 
-def emit(indis, fams, order, est, opts):
-    out = ["0 HEAD", "1 SOUR gedcom-anonymizer", "1 GEDC",
-           "2 VERS 5.5.1", "2 FORM LINEAGE-LINKED", "1 CHAR UTF-8"]
+class JSStringWriter:
+    """Writes `window.<VAR>="...";` to `f`, the text written to it going
+    between the quotes. Chunks are escaped as they fill up; since json.dumps
+    escapes character by character the result is byte-identical to
+    json.dumps of the whole text."""
+
+    def __init__(self, f, var_name, chunk=1 << 16):
+        self.f = f
+        self.chunk = chunk
+        self.pending, self.size = [], 0
+        f.write("window.%s=\"" % var_name)
+
+    def write(self, text):
+        self.pending.append(text)
+        self.size += len(text)
+        if self.size >= self.chunk:
+            self.flush()
+
+    def flush(self):
+        if self.pending:
+            self.f.write(json.dumps("".join(self.pending))[1:-1])
+            self.pending, self.size = [], 0
+
+    def close(self):
+        self.flush()
+        self.f.write("\";\n")
+
+
+class Tee:
+    """Forwards every write to each of `outs`."""
+
+    def __init__(self, *outs):
+        self.outs = outs
+
+    def write(self, text):
+        for out in self.outs:
+            out.write(text)
+
+
+class CompactIndex:
+    """The viewer's parsed form of the anonymized GEDCOM, built while it is
+    written: fed the output text (write), it repeats what parseGedcom() in
+    index.html does with it, and compact() returns the result pre-indexed
+    for dataFromCompact() there -- so the viewer can skip parsing."""
+
+    def __init__(self):
+        self.people = {}   # id -> [name, any name, surnames (ordered, deduped), birth, bapt, sex]
+        self.fams = {}     # id -> [husb, wife, [chil], marr]
+        self.partial = ""
+        self.cur = self.ctx = self.fam = None
+        self.cur_evt = self.fam_evt = None
+        self._new_name()
+
+    def _new_name(self):
+        self.nb_surns, self.nb_type, self.nb_disp = {}, None, None
+
+    def _flush_name(self):
+        p = self.people.get(self.cur)
+        if p is not None and self.nb_disp is not None:
+            if p[1] is None:
+                p[1] = self.nb_disp
+            if self.nb_type != "married":
+                if p[0] is None:
+                    p[0] = self.nb_disp
+                for s in self.nb_surns:
+                    s = s.strip(JS_SPACE)
+                    if s:
+                        p[2].setdefault(s)
+        self._new_name()
+
+    def _date(self, line):
+        nums = YEAR_RE.findall(line[7:])
+        return int(nums[-1]) if nums else None
+
+    def write(self, text):
+        lines = (self.partial + text).split("\n")
+        self.partial = lines.pop()
+        for line in lines:
+            self.line(line.rstrip("\r"))
+
+    def line(self, line):
+        if line.startswith("0 @"):
+            if self.ctx == "I":
+                self._flush_name()
+                self.cur_evt = None
+            elif self.ctx == "F":
+                self.fams[self.cur] = self.fam
+            p = JS_SPACE_RE.split(line)
+            self.cur = p[1]
+            typ = p[2] if len(p) > 2 else ""
+            if typ == "INDI":
+                self.people.setdefault(self.cur, [None, None, {}, None, None, None])
+                self.ctx = "I"
+            elif typ == "FAM":
+                self.fam = [None, None, [], None]
+                self.ctx = "F"
+                self.fam_evt = None
+            else:
+                self.ctx = None
+        elif self.ctx == "I":
+            p = self.people[self.cur]
+            if line.startswith("1 NAME "):
+                self._flush_name()
+                self.cur_evt = None
+                rest = line[7:]
+                m = SURN_SLASH_RE.search(rest)
+                if m:
+                    self.nb_surns.setdefault(m.group(1))
+                self.nb_disp = JS_SPACE_RE.sub(" ", rest.replace("/", " ")).strip(JS_SPACE) or None
+            elif line.startswith("2 TYPE "):
+                self.nb_type = line[7:].strip(JS_SPACE).lower()
+            elif line.startswith("2 SURN "):
+                self.nb_surns.setdefault(line[7:])
+            elif line.startswith("2 DATE ") and self.cur_evt:
+                y = self._date(line)
+                slot = 3 if self.cur_evt == "BIRT" else 4
+                if y is not None and p[slot] is None:
+                    p[slot] = y
+            elif line.startswith("1 SEX "):
+                self._flush_name()
+                self.cur_evt = None
+                s = line[6:].strip(JS_SPACE)[:1].upper()
+                if s in ("M", "F"):
+                    p[5] = s
+            elif line.startswith("1 "):
+                self._flush_name()
+                if line.startswith("1 BIRT"):
+                    self.cur_evt = "BIRT"
+                elif line.startswith("1 BAPM") or line.startswith("1 CHR"):
+                    self.cur_evt = "BAPT"
+                else:
+                    self.cur_evt = None
+        elif self.ctx == "F":
+            if line.startswith(("1 HUSB ", "1 WIFE ", "1 CHIL ")):
+                p = JS_SPACE_RE.split(line)
+                ref = p[2] if len(p) > 2 else None
+                if line[2] == "C":
+                    self.fam[2].append(ref)
+                else:
+                    self.fam[0 if line[2] == "H" else 1] = ref
+                self.fam_evt = None
+            elif line.startswith("1 MARR"):
+                self.fam_evt = "MARR"
+            elif line.startswith("2 DATE ") and self.fam_evt == "MARR":
+                y = self._date(line)
+                if y is not None and self.fam[3] is None:
+                    self.fam[3] = y
+            elif line.startswith("1 "):
+                self.fam_evt = None
+
+    def close(self):
+        if self.partial:
+            self.line(self.partial.rstrip("\r"))
+            self.partial = ""
+        if self.ctx == "I":
+            self._flush_name()
+        elif self.ctx == "F":
+            self.fams[self.cur] = self.fam
+        self.ctx = None
+
+    def compact(self):
+        """JSON-ready dict. People are numbered in file order and their xrefs
+        listed in "ids", followed by any xref a family names that is not a
+        person. Names and surnames are indices into "strings" (-1: none);
+        the number columns are base64 little-endian typed arrays -- Int32
+        for indices, Int16 for years with -32768 for none. A person's
+        surnames are surn[surnAt[i]:surnAt[i + 1]], a family's children
+        chil[chilAt[f]:chilAt[f + 1]]."""
+        ids = list(self.people)
+        index = {rid: i for i, rid in enumerate(ids)}
+        strings, string_index = [], {}
+
+        def ref(rid):
+            if rid is None:
+                return -1
+            if rid not in index:
+                index[rid] = len(ids)
+                ids.append(rid)
+            return index[rid]
+
+        def text(s):
+            if s is None:
+                return -1
+            if s not in string_index:
+                string_index[s] = len(strings)
+                strings.append(s)
+            return string_index[s]
+
+        def year(y):
+            return NO_YEAR if y is None else y
+
+        name, name_any = array("i"), array("i")
+        surn_at, surn = array("i", [0]), array("i")
+        birth, bapt, sex = array("h"), array("h"), []
+        for p in self.people.values():
+            name.append(text(p[0]))
+            name_any.append(text(p[1]))
+            surn.extend(text(s) for s in p[2])
+            surn_at.append(len(surn))
+            birth.append(year(p[3]))
+            bapt.append(year(p[4]))
+            sex.append(p[5] or ".")
+        husb, wife, marr = array("i"), array("i"), array("h")
+        chil_at, chil = array("i", [0]), array("i")
+        for fam in self.fams.values():
+            husb.append(ref(fam[0]))
+            wife.append(ref(fam[1]))
+            chil.extend(ref(c) for c in fam[2])
+            chil_at.append(len(chil))
+            marr.append(year(fam[3]))
+
+        def b64(arr):
+            if sys.byteorder == "big":
+                arr.byteswap()
+            return base64.b64encode(arr.tobytes()).decode("ascii")
+
+        return {"version": 1, "people": len(self.people), "ids": ids, "strings": strings,
+                "name": b64(name), "nameAny": b64(name_any), "surnAt": b64(surn_at),
+                "surn": b64(surn), "birth": b64(birth), "bapt": b64(bapt), "sex": "".join(sex),
+                "famIds": list(self.fams), "husb": b64(husb), "wife": b64(wife),
+                "chilAt": b64(chil_at), "chil": b64(chil), "marr": b64(marr)}
+
+
+def write_compact(path, index, var_name):
+    """Write CompactIndex.compact() as JSON, or for a .js path as
+    window.<var_name>_COMPACT={...}; -- which the viewer prefers over
+    window.<var_name> when both are loaded."""
+    data = json.dumps(index.compact(), ensure_ascii=False, separators=(",", ":"))
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        if path.lower().endswith(".js"):
+            f.write("window.%s_COMPACT=%s;\n" % (var_name, data))
+        else:
+            f.write(data + "\n")
+
+
+def emit(indis, fams, order, living_of, opts, out):
+    """Write the anonymized GEDCOM to `out` (anything with .write) record by
+    record, `living_of` being the living_status table; returns the number
+    of individual records written and how many of them were living."""
+    write = out.write
+    pos = {rid: i for i, rid in enumerate(indis)}
+    for line in ("0 HEAD", "1 SOUR gedcom-anonymizer", "1 GEDC",
+                 "2 VERS 5.5.1", "2 FORM LINEAGE-LINKED", "1 CHAR UTF-8"):
+        write(line + "\n")
     total = living_count = 0
 
     for kind, rid in order:
         if kind == "I":
             ind = indis[rid]
             total += 1
-            living = is_living(ind, est, opts.year, opts.max_age, opts.assume_living)
+            living = living_of[pos[rid]]
             if living:
                 living_count += 1
 
-            out.append("0 %s INDI" % ind.id)
+            write("0 %s INDI\n" % ind.id)
             for name in ind.names:
                 text = initials(name["text"]) if living else name["text"].strip()
-                out.append("1 NAME %s" % text)
+                write("1 NAME %s\n" % text)
                 if name["type"]:
-                    out.append("2 TYPE %s" % name["type"])
+                    write("2 TYPE %s\n" % name["type"])
                 surn = surname_of(name)
                 if surn:
-                    out.append("2 SURN %s" % surn)
+                    write("2 SURN %s\n" % surn)
             if ind.sex:
-                out.append("1 SEX %s" % ind.sex)   # drives node shape; not sensitive
+                write("1 SEX %s\n" % ind.sex)   # drives node shape; not sensitive
             show_year = not (living and opts.redact_living_year)
             if show_year and ind.birth_year is not None:
-                out.append("1 BIRT")
-                out.append("2 DATE %d" % ind.birth_year)
+                write("1 BIRT\n")
+                write("2 DATE %d\n" % ind.birth_year)
             elif show_year and ind.chr_year is not None:
-                out.append("1 CHR")
-                out.append("2 DATE %d" % ind.chr_year)
+                write("1 CHR\n")
+                write("2 DATE %d\n" % ind.chr_year)
         else:
             fam = fams[rid]
             if not fam.husb and not fam.wife and not fam.chil:
                 continue
-            out.append("0 %s FAM" % fam.id)
+            write("0 %s FAM\n" % fam.id)
             if fam.husb:
-                out.append("1 HUSB %s" % fam.husb)
+                write("1 HUSB %s\n" % fam.husb)
             if fam.wife:
-                out.append("1 WIFE %s" % fam.wife)
+                write("1 WIFE %s\n" % fam.wife)
             for c in fam.chil:
-                out.append("1 CHIL %s" % c)
+                write("1 CHIL %s\n" % c)
             # marriage year drives the marriage glyph's position; redact only
             # when both spouses are living and living years are being redacted.
             both_living = (opts.redact_living_year and fam.husb and fam.wife
-                           and fam.husb in indis
-                           and is_living(indis[fam.husb], est, opts.year, opts.max_age, opts.assume_living)
-                           and fam.wife in indis
-                           and is_living(indis[fam.wife], est, opts.year, opts.max_age, opts.assume_living))
+                           and fam.husb in pos and living_of[pos[fam.husb]]
+                           and fam.wife in pos and living_of[pos[fam.wife]])
             if fam.marr_year is not None and not both_living:
-                out.append("1 MARR")
-                out.append("2 DATE %d" % fam.marr_year)
-    out.append("0 TRLR")
-    return "\n".join(out) + "\n", total, living_count
+                write("1 MARR\n")
+                write("2 DATE %d\n" % fam.marr_year)
+    write("0 TRLR\n")
+    return total, living_count
+
+
+def default_output(path):
+    return re.sub(r"\.ged(com)?$", "", path, flags=re.I) + ".anon.ged"
+
+
+def anonymize_file(input_path, output_path, opts, var_name=None):
+    """The whole pipeline for one file: parse (through opts.cache if set),
+    estimate, decide who is living and write `output_path` -- wrapped as
+    window.<var_name or opts.var_name>="..."; for --js or a .js path.
+
+    Returns a summary dict: the counts and the seconds taken.
+    """
+    started = time.perf_counter()
+    var_name = var_name or opts.var_name
+    js = opts.js or output_path.lower().endswith(".js")
+    result = {"input": input_path, "output": output_path, "var": var_name if js else None,
+              "cache": None}
+    if opts.cache:
+        cache = load_cache(opts.cache)
+        with open(input_path, "rb") as f:
+            indis, fams, order, reparsed = parse_cached(f, cache)
+        est, reestimated = estimate_cached(indis, fams, opts.gen_gap, cache)
+        if cache.pop("dirty", False):
+            save_cache(opts.cache, cache)
+        result["cache"] = (reparsed, len(cache["records"]), reestimated, len(cache["estimates"]))
+    else:
+        with open(input_path, "r", encoding="utf-8") as f:
+            indis, fams, order = parse(f)
+        est = estimate_sharded(indis, fams, opts.gen_gap, opts.jobs)
+    living_of, counts = living_status(indis, est, opts)
+    index = CompactIndex() if opts.compact else None
+    with open(output_path, "w", encoding="utf-8", newline="") as f:
+        out = JSStringWriter(f, var_name) if js else f
+        total, living = emit(indis, fams, order, living_of, opts, Tee(out, index) if index else out)
+        if js:
+            out.close()
+    if index:
+        index.close()
+        write_compact(opts.compact, index, var_name)
+    result.update(counts, total=total, written_living=living, families=len(fams),
+                  seconds=time.perf_counter() - started)
+    return result
+
+
+def batch_inputs(source, out_dir=None):
+    """(input, output, var) for every file of a batch. `source` is either a
+    directory -- every *.ged / *.gedcom in it, except earlier *.anon.ged
+    output -- or a manifest with one `input [output [VAR]]` per line (#
+    starts a comment, paths are relative to the manifest). Outputs default
+    to <input>.anon.ged; in `out_dir`, if given, at the input's path below
+    the directory all inputs share, so a/tree.ged and b/tree.ged stay apart.
+    Raises ValueError if two files would write the same output."""
+    if os.path.isdir(source):
+        listed = [(path, None, None)
+                  for path in sorted(os.path.join(source, name) for name in os.listdir(source))
+                  if re.search(r"(?<!\.anon)\.ged(com)?$", path, flags=re.I) and os.path.isfile(path)]
+    else:
+        base = os.path.dirname(source)
+        listed = []
+        with open(source, "r", encoding="utf-8") as f:
+            for n, line in enumerate(f, 1):
+                fields = line.split("#", 1)[0].split()
+                if not fields:
+                    continue
+                if len(fields) > 3:
+                    raise ValueError("%s:%d: expected `input [output [VAR]]`" % (source, n))
+                listed.append((os.path.join(base, fields[0]),
+                               os.path.join(base, fields[1]) if len(fields) > 1 else None,
+                               fields[2] if len(fields) > 2 else None))
+    if out_dir and listed:
+        root = os.path.commonpath([os.path.dirname(os.path.abspath(path)) for path, _, _ in listed])
+    jobs, writer = [], {}
+    for path, out, var_name in listed:
+        if out is None:
+            out = default_output(path)
+            if out_dir:
+                out = os.path.join(out_dir, os.path.relpath(os.path.abspath(out), root))
+        key = os.path.normcase(os.path.abspath(out))
+        if key in writer:
+            raise ValueError("%s and %s would both be written to %s" % (writer[key], path, out))
+        writer[key] = path
+        jobs.append((path, out, var_name))
+    return jobs
+
+
+def _batch_one(job, opts):
+    path, out, var_name = job
+    try:
+        return anonymize_file(path, out, opts, var_name)
+    except Exception as e:
+        return {"input": path, "output": out, "error": "%s: %s" % (type(e).__name__, e)}
+
+
+def run_batch(jobs, opts):
+    """Anonymize every (input, output, var) of `jobs` with the same options,
+    on opts.jobs worker processes. With --cache, the cache is a directory
+    holding one cache file per output (named by its path below the directory
+    all outputs share; batch_inputs keeps outputs distinct). Reports each
+    file and the totals on stderr; returns the number of failures."""
+    started = time.perf_counter()
+    results = []
+
+    parallel = opts.jobs > 1 and len(jobs) > 1
+    outs = [os.path.abspath(out) for _, out, _ in jobs]
+    root = os.path.commonpath([os.path.dirname(out) for out in outs])
+    for out in outs:
+        os.makedirs(os.path.dirname(out), exist_ok=True)
+        if opts.cache:
+            os.makedirs(os.path.dirname(os.path.join(opts.cache, os.path.relpath(out, root))),
+                        exist_ok=True)
+
+    def file_opts(out):
+        # --jobs counts files here; each file is estimated serially.
+        return argparse.Namespace(**dict(
+            vars(opts), jobs=1,
+            cache=os.path.join(opts.cache, os.path.relpath(os.path.abspath(out), root) + ".cache")
+            if opts.cache else None))
+
+    if parallel:
+        # Largest first, so no big tree is left to start last.
+        jobs = sorted(jobs, key=lambda job: -os.path.getsize(job[0]) if os.path.isfile(job[0]) else 0)
+        with concurrent.futures.ProcessPoolExecutor(min(opts.jobs, len(jobs))) as pool:
+            futures = [pool.submit(_batch_one, job, file_opts(job[1])) for job in jobs]
+            for fut in futures:
+                results.append(fut.result())
+                _report_batch_file(results[-1])
+    else:
+        for job in jobs:
+            results.append(_batch_one(job, file_opts(job[1])))
+            _report_batch_file(results[-1])
+
+    done = [r for r in results if "error" not in r]
+    sys.stderr.write(
+        "Batch: %d of %d files, %d individuals (%d living) + %d families in %.2fs "
+        "(%.2fs of work, %d jobs). Reference year %d, max age %d.\n" % (
+            len(done), len(results), sum(r["total"] for r in done),
+            sum(r["written_living"] for r in done), sum(r["families"] for r in done),
+            time.perf_counter() - started, sum(r["seconds"] for r in done),
+            max(1, min(opts.jobs, len(jobs))), opts.year, opts.max_age))
+    return len(results) - len(done)
+
+
+def _report_batch_file(r):
+    if "error" in r:
+        sys.stderr.write("ERROR: %s: %s\n" % (r["input"], r["error"]))
+        return
+    sys.stderr.write("%7.2fs  %s -> %s: %d individuals (%d living) + %d families%s\n" % (
+        r["seconds"], os.path.relpath(r["input"]), os.path.relpath(r["output"]),
+        r["total"], r["written_living"], r["families"],
+        ", reparsed %d of %d records" % r["cache"][:2] if r["cache"] else ""))
 
 
 def main(argv=None):
     ap = argparse.ArgumentParser(
         description="Anonymize a GEDCOM file (initials for living people, minimal fields).")
-    ap.add_argument("input", help="input .ged file")
+    ap.add_argument("input", help="input .ged file (with --batch: directory or manifest)")
     ap.add_argument("output", nargs="?", help="output path (default: <input>.anon.ged; "
                                               ".js wraps as window.<VAR>=...)")
     ap.add_argument("--js", action="store_true",
@@ -376,32 +1097,50 @@ def main(argv=None):
                     help="treat people with no date evidence as living (default: historical)")
     ap.add_argument("--redact-living-year", action="store_true",
                     help="also drop the birth year of living people (default: keep)")
+    ap.add_argument("--cache", metavar="PATH",
+                    help="incremental cache file (created if missing): reparse only changed "
+                         "records and re-estimate only the family groups they touch")
+    ap.add_argument("--compact", metavar="PATH",
+                    help="also write the viewer's pre-indexed form of the output: JSON, or "
+                         "window.<VAR>_COMPACT={...} for a .js path (loads without parsing)")
+    ap.add_argument("--batch", action="store_true",
+                    help="input is a directory of .ged files or a manifest of `input [output "
+                         "[VAR]]` lines; output, if given, is the directory for default outputs "
+                         "and --cache a directory of per-file caches")
+    ap.add_argument("--jobs", type=int,
+                    help="worker processes: files of a --batch (default: all CPUs), or else the "
+                         "family components of one large tree during estimation (default: 1; "
+                         "check bench_anonymize.py --jobs first, it rarely pays)")
     opts = ap.parse_args(argv)
+    if opts.jobs is None:
+        opts.jobs = (os.cpu_count() or 1) if opts.batch else 1
 
-    if not opts.output:
-        opts.output = re.sub(r"\.ged(com)?$", "", opts.input, flags=re.I) + ".anon.ged"
-    if opts.output.lower().endswith(".js"):
-        opts.js = True
-
-    with open(opts.input, "r", encoding="utf-8") as f:
-        text = f.read()
-
-    indis, fams, order = parse(text)
-    est = estimate_birth_years(indis, fams, opts.gen_gap)
-    gedcom, total, living = emit(indis, fams, order, est, opts)
-
-    payload = gedcom
-    if opts.js:
-        payload = "window.%s=%s;\n" % (opts.var_name, json.dumps(gedcom))
-    with open(opts.output, "w", encoding="utf-8", newline="") as f:
-        f.write(payload)
+    if opts.batch:
+        if opts.compact:
+            sys.exit("ERROR: --compact names a single file and cannot be used with --batch")
+        try:
+            jobs = batch_inputs(opts.input, opts.output)
+        except (OSError, ValueError) as e:
+            sys.exit("ERROR: %s" % e)
+        if not jobs:
+            sys.exit("ERROR: no GEDCOM files in %s" % opts.input)
+        if run_batch(jobs, opts):
+            sys.exit(1)
+        return
 
+    r = anonymize_file(opts.input, opts.output or default_output(opts.input), opts)
+    if r["cache"]:
+        sys.stderr.write("Cache %s: reparsed %d of %d records, re-estimated %d of %d family groups.\n"
+                         % ((opts.cache,) + r["cache"]))
     sys.stderr.write(
         "Anonymized %d individuals (%d living / anonymized, %d historical) + %d families.\n"
-        "Reference year %d, max age %d. Wrote %s%s.\n" % (
-            total, living, total - living, len(fams), opts.year, opts.max_age,
-            os.path.relpath(opts.output),
-            (" (JS: window.%s)" % opts.var_name) if opts.js else ""))
+        "Living status: %d by death record, %d by (estimated) birth year, %d undated.\n"
+        "Reference year %d, max age %d. Wrote %s%s%s.\n" % (
+            r["total"], r["written_living"], r["total"] - r["written_living"], r["families"],
+            r["death"], r["dated"], r["undated"], opts.year, opts.max_age,
+            os.path.relpath(r["output"]),
+            (" (JS: window.%s)" % r["var"]) if r["var"] else "",
+            (" and %s" % os.path.relpath(opts.compact)) if opts.compact else ""))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+"""
+bench_anonymize.py
+------------------
+Benchmarks for anonymize_gedcom.py on a synthetic GEDCOM (our real trees
+can't be published, so every number here is reproducible from a seed).
+
+  - Phases (default): time and peak memory of parse, estimate_birth_years,
+    living_status and emit on trees of 10k, 100k and 1M individuals. Judge
+    anonymizer performance changes against this.
+  - Sharding (--jobs N): estimate_sharded() on N workers timed next to the
+    serial estimate, as a "sharded" phase -- it is opt-in in the anonymizer
+    until this shows a win.
+  - Tokenizer (--tokenizer): split_line() called per line against the
+    tokens() fast path that parse() uses, on the same lines, after checking
+    both give the same fields; plus parse() as a whole.
+
+The generator (synthetic_lines) takes the tree's shape: generations,
+missing-date rate, sibling counts and citation noise.
+
+Usage:
+    python bench_anonymize.py [--sizes 10000,100000,1000000] [--json out.json]
+    python bench_anonymize.py --generations 20 --missing-dates 0.6 --siblings 2-9 --noise 3
+    python bench_anonymize.py --jobs 4 --sizes 300000 --no-memory
+    python bench_anonymize.py --tokenizer --sizes 100000 [--repeat R]
+    python bench_anonymize.py --write tree.ged --sizes 50000
+
+No external dependencies.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import anonymize_gedcom as anon
+
+GIVEN = ["Jan", "Pieter", "Marie", "Anna", "Joannes", "Catharina", "Petrus",
+         "Elisabeth", "Jacobus", "Maria", "Carolus", "Johanna", "Frans", "Rosalie"]
+SURNAMES = ["Vuijlsteke", "Dujardin", "Inghels", "Schamelot", "Van Acker", "De Smet",
+            "Peeters", "Janssens", "Maes", "Claes", "Goossens", "Wouters"]
+MONTHS = ["JAN", "FEB", "MAR", "APR", "MAY", "JUN", "JUL", "AUG", "SEP", "OCT", "NOV", "DEC"]
+PLACES = ["Gent", "Brugge", "Kortrijk", "Ieper", "Aalst", "Lokeren"]
+
+
+def synthetic_lines(people, generations=10, missing_dates=0.3, siblings=(1, 6), noise=1.0,
+                    seed=1, last_year=2020):
+    """Lines (without newlines) of a synthetic GEDCOM of about `people`
+    individuals in `generations` generations, 30 years apart and ending
+    around `last_year`, so the recent ones count as living.
+
+    Each generation's children come from the couples before, `siblings`
+    (lo, hi) to a family, and most marry someone from outside the tree who
+    starts a new couple. A `missing_dates` fraction of people has no birth
+    date -- a christening, a residence or nothing instead -- and so do
+    deaths and marriages, which is what leaves estimate_birth_years work
+    to do. `noise` scales the clutter the anonymizer must skip: source
+    citations with their own (recent) dates, places, notes, change dates.
+    """
+    rng = random.Random(seed)
+    per_gen = max(2, people // generations)
+    n = 0
+    yield from ("0 HEAD", "1 SOUR synthetic", "1 GEDC", "2 VERS 5.5.1",
+                "2 FORM LINEAGE-LINKED", "1 CHAR UTF-8")
+
+    def date(year):
+        return "%d %s %d" % (rng.randint(1, 28), rng.choice(MONTHS), year)
+
+    def clutter(level):
+        # citations and the like under an event (level 2) or the record (1)
+        out = []
+        for _ in range(int(rng.random() * 2 * noise + 0.5)):
+            out += ["%d SOUR @S1@" % level, "%d PAGE Akte %d" % (level + 1, rng.randint(1, 999)),
+                    "%d DATA" % (level + 1), "%d DATE %d" % (level + 2, rng.randint(1990, 2020))]
+        if rng.random() < 0.3 * noise:
+            out.append("%d PLAC %s" % (level, rng.choice(PLACES)))
+        return out
+
+    def person(sex, surname, born):
+        nonlocal n
+        n += 1
+        xref = "@I%d@" % n
+        out = ["0 %s INDI" % xref,
+               "1 NAME %s %s /%s/" % (rng.choice(GIVEN), rng.choice(GIVEN), surname),
+               "2 GIVN %s" % rng.choice(GIVEN), "2 SURN %s" % surname, "1 SEX %s" % sex]
+        if rng.random() >= missing_dates:
+            out += ["1 BIRT", "2 DATE %s" % date(born)] + clutter(2)
+        elif rng.random() < 0.3:
+            out += ["1 CHR", "2 DATE %s" % date(born)] + clutter(2)
+        elif rng.random() < 0.3:
+            out += ["1 RESI", "2 DATE %d" % (born + rng.randint(20, 50))]
+        died = born + rng.randint(30, 95)
+        if died < last_year:
+            out.append("1 DEAT")
+            if rng.random() >= missing_dates:
+                out.append("2 DATE ABT %d" % died)
+            out += clutter(2)
+        out += clutter(1)
+        if rng.random() < 0.2 * noise:
+            out += ["1 NOTE Overgenomen uit het parochieregister", "2 CONT van %s" % rng.choice(PLACES)]
+        out += ["1 CHAN", "2 DATE %s" % date(rng.randint(2005, 2020))]
+        return xref, out
+
+    def spouse_for(xref, sex, born):
+        other, lines = person("F" if sex == "M" else "M", rng.choice(SURNAMES), born + rng.randint(-5, 5))
+        return (xref, other) if sex == "M" else (other, xref), lines
+
+    first = last_year - 30 * (generations - 1)
+    couples, fams = [], []      # couples: (husb, wife, born); fams: (husb, wife, kids, married)
+    for _ in range(per_gen // 2):
+        born = first + rng.randint(-8, 8)
+        husb, lines = person("M", rng.choice(SURNAMES), born)
+        yield from lines
+        (husb, wife), lines = spouse_for(husb, "M", born)
+        yield from lines
+        couples.append((husb, wife, born))
+    for g in range(1, generations + 1):
+        marry = 0.7 if g < generations else 0.0   # the last round only has children
+        wanted = per_gen / (1 + marry) if g < generations else 0
+        rng.shuffle(couples)
+        next_couples, made = [], 0
+        for husb, wife, born in couples:
+            kids = []
+            if made < wanted:
+                for _ in range(rng.randint(*siblings)):
+                    kid_born = born + rng.randint(22, 38)
+                    sex = rng.choice("MF")
+                    kid, lines = person(sex, rng.choice(SURNAMES), kid_born)
+                    yield from lines
+                    kids.append(kid)
+                    made += 1
+                    if rng.random() < marry:
+                        pair, lines = spouse_for(kid, sex, kid_born)
+                        yield from lines
+                        next_couples.append(pair + (kid_born,))
+            fams.append((husb, wife, kids, born + rng.randint(20, 30)))
+        couples = next_couples
+    for i, (husb, wife, kids, married) in enumerate(fams, 1):
+        yield "0 @F%d@ FAM" % i
+        yield "1 HUSB %s" % husb
+        yield "1 WIFE %s" % wife
+        for kid in kids:
+            yield "1 CHIL %s" % kid
+        if rng.random() >= missing_dates:
+            yield "1 MARR"
+            yield "2 DATE %s" % date(married)
+            yield from clutter(2)
+    yield from ("0 @S1@ SOUR", "1 TITL Parochieregisters", "0 TRLR")
+
+
+def synthetic_gedcom(people, seed=1, **shape):
+    """synthetic_lines as one text."""
+    return "\n".join(synthetic_lines(people, seed=seed, **shape)) + "\n"
+
+
+def write_synthetic(path, people, seed=1, **shape):
+    """Write synthetic_lines to `path`; returns the number of lines."""
+    count = 0
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        for line in synthetic_lines(people, seed=seed, **shape):
+            f.write(line + "\n")
+            count += 1
+    return count
+
+
+def best_of(repeat, fn, *args):
+    best = float("inf")
+    for _ in range(repeat):
+        t = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - t)
+    return best, result
+
+
+def bench_tokenizer(text, repeat):
+    lines = list(anon.iter_lines(text))
+
+    def per_line():
+        split = anon.split_line
+        return [p for p in (split(line) for line in lines if line) if p]
+
+    def fast():
+        return list(anon.tokens(lines))
+
+    slow_t, slow = best_of(repeat, per_line)
+    fast_t, got = best_of(repeat, fast)
+    if got != slow:
+        raise SystemExit("ERROR: tokens() and split_line() disagree")
+    parse_t, (indis, fams, _) = best_of(repeat, anon.parse, text)
+    print("%d lines, %d individuals, %d families (best of %d)" % (
+        len(lines), len(indis), len(fams), repeat))
+    print("  split_line per line  %7.3fs  %6.2f M lines/s" % (slow_t, len(lines) / slow_t / 1e6))
+    print("  tokens()             %7.3fs  %6.2f M lines/s  (%.1fx)" % (
+        fast_t, len(lines) / fast_t / 1e6, slow_t / fast_t))
+    print("  parse()              %7.3fs  %6.2f M lines/s" % (parse_t, len(lines) / parse_t / 1e6))
+
+
+PHASES = ("parse", "estimate", "living", "emit")
+
+
+def run_phases(path, out_path, opts, trace=False):
+    """The anonymizer's pipeline on `path`, phase by phase, as main() runs
+    it. Returns {phase: (seconds, peak bytes)}; the peak -- allocated on top
+    of what the earlier phases left -- is None unless `trace`, which needs
+    tracemalloc running (and then the seconds are inflated). With opts.jobs
+    above 1 there is a "sharded" phase too (untraced: its work is in other
+    processes), which must give the serial estimates."""
+    results = {}
+
+    def phase(name, fn):
+        if trace:
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+        t = time.perf_counter()
+        value = fn()
+        seconds = time.perf_counter() - t
+        results[name] = (seconds, tracemalloc.get_traced_memory()[1] - base if trace else None)
+        return value
+
+    def parse():
+        with open(path, "r", encoding="utf-8") as f:
+            return anon.parse(f)
+
+    def emit():
+        with open(out_path, "w", encoding="utf-8", newline="") as f:
+            return anon.emit(indis, fams, order, living_of, opts, f)
+
+    indis, fams, order = phase("parse", parse)
+    est = phase("estimate", lambda: anon.estimate_birth_years(indis, fams, opts.gen_gap))
+    if opts.jobs > 1 and not trace:
+        if phase("sharded", lambda: anon.estimate_sharded(indis, fams, opts.gen_gap, opts.jobs)) != est:
+            raise SystemExit("ERROR: estimate_sharded() and estimate_birth_years() disagree")
+    living_of, _ = phase("living", lambda: anon.living_status(indis, est, opts))
+    phase("emit", emit)
+    return results
+
+
+def bench_phases(sizes, shape, seed, memory=True, jobs=1):
+    """Time (and with `memory`, peak traced memory) per phase for a
+    synthetic tree of each size. Memory is measured in a second run, as
+    tracemalloc slows everything it watches. Returns one row per size."""
+    opts = argparse.Namespace(year=shape.get("last_year", 2020) + 5, max_age=100, gen_gap=30,
+                              assume_living=False, redact_living_year=False, jobs=jobs)
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        src, dst = os.path.join(tmp, "tree.ged"), os.path.join(tmp, "tree.anon.ged")
+        for people in sizes:
+            t = time.perf_counter()
+            lines = write_synthetic(src, people, seed=seed, **shape)
+            row = {"people": people, "lines": lines, "bytes": os.path.getsize(src),
+                   "generate": time.perf_counter() - t}
+            timed = run_phases(src, dst, opts)
+            traced = {}
+            if memory:
+                tracemalloc.start()
+                try:
+                    traced = run_phases(src, dst, opts, trace=True)
+                finally:
+                    tracemalloc.stop()
+            for name in PHASES:
+                row[name] = {"seconds": timed[name][0],
+                             "peak_bytes": traced[name][1] if memory else None}
+            if "sharded" in timed:
+                row["sharded"] = {"seconds": timed["sharded"][0], "jobs": jobs}
+            rows.append(row)
+            print_phases(row)
+    return rows
+
+
+def print_phases(row):
+    print("%d people, %d lines, %.1f MB (generated in %.1fs)" % (
+        row["people"], row["lines"], row["bytes"] / 1e6, row["generate"]))
+    total = 0.0
+    for name in PHASES:
+        r = row[name]
+        total += r["seconds"]
+        peak = "%9.1f MB" % (r["peak_bytes"] / 1e6) if r["peak_bytes"] is not None else ""
+        print("  %-9s %8.3fs %s" % (name, r["seconds"], peak))
+    print("  %-9s %8.3fs  (%.0f people/s)" % ("total", total, row["people"] / total))
+    if "sharded" in row:
+        r = row["sharded"]
+        print("  %-9s %8.3fs  (estimate on %d jobs, %.2fx serial)" % (
+            "sharded", r["seconds"], r["jobs"], row["estimate"]["seconds"] / r["seconds"]))
+    sys.stdout.flush()
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Benchmark anonymize_gedcom.py on synthetic GEDCOMs.")
+    ap.add_argument("--sizes", default="10000,100000,1000000",
+                    help="comma-separated tree sizes in individuals (default: 10000,100000,1000000)")
+    ap.add_argument("--generations", type=int, default=10, help="generations per tree (default: 10)")
+    ap.add_argument("--missing-dates", type=float, default=0.3,
+                    help="fraction of births, deaths and marriages without a date (default: 0.3)")
+    ap.add_argument("--siblings", default="1-6", help="children per family, lo-hi (default: 1-6)")
+    ap.add_argument("--noise", type=float, default=1.0,
+                    help="scale of citation / place / note clutter (default: 1.0)")
+    ap.add_argument("--seed", type=int, default=1, help="generator seed (default: 1)")
+    ap.add_argument("--no-memory", action="store_true",
+                    help="skip the tracemalloc run that measures peak memory per phase")
+    ap.add_argument("--jobs", type=int, default=1,
+                    help="also time estimate_sharded() on this many workers (default: 1, off)")
+    ap.add_argument("--json", metavar="PATH", help="also write the results as JSON")
+    ap.add_argument("--tokenizer", action="store_true",
+                    help="instead compare split_line() with tokens() on the first size")
+    ap.add_argument("--repeat", type=int, default=3,
+                    help="--tokenizer runs per measurement; best counts (default: 3)")
+    ap.add_argument("--write", metavar="PATH",
+                    help="only write a synthetic GEDCOM of the first size to PATH")
+    opts = ap.parse_args(argv)
+
+    try:
+        sizes = [int(n) for n in opts.sizes.split(",")]
+        lo, hi = (int(n) for n in opts.siblings.split("-"))
+    except ValueError:
+        sys.exit("ERROR: --sizes takes numbers like 10000,100000 and --siblings lo-hi like 1-6")
+    shape = {"generations": opts.generations, "missing_dates": opts.missing_dates,
+             "siblings": (lo, hi), "noise": opts.noise}
+
+    if opts.write:
+        lines = write_synthetic(opts.write, sizes[0], seed=opts.seed, **shape)
+        print("Wrote %s: %d lines." % (opts.write, lines))
+        return
+    if opts.tokenizer:
+        bench_tokenizer(synthetic_gedcom(sizes[0], seed=opts.seed, **shape), opts.repeat)
+        return
+    rows = bench_phases(sizes, shape, opts.seed, memory=not opts.no_memory, jobs=opts.jobs)
+    if opts.json:
+        with open(opts.json, "w", encoding="utf-8") as f:
+            json.dump({"python": platform.python_version(), "seed": opts.seed, "shape": shape,
+                       "results": rows}, f, indent=1)
+
+
+if __name__ == "__main__":
+    main()
@@ -16,16 +16,35 @@ Usage:
     python optimize.py              # Run optimization (takes a few minutes)
     python optimize.py --eval       # Evaluate current game.js parameters
     python optimize.py --apply      # Apply best params to game.js
+    python optimize.py --eval --engine python   # Reference (slow) engine
+    python optimize.py --eval --profile # Time spent in each phase of a year
+    python optimize.py --eval --seeds 32 --workers 8    # Fitness distribution over seeds
+    python optimize.py --sweep --seeds 8 --workers 8 --out sweep.csv   # Sensitivity sweep
+    python optimize.py --workers 32 # Score each DE generation on 32 processes
+    python optimize.py --opt-runs 15    # Fewer runs per candidate (common random numbers)
+    python optimize.py --race       # Drop hopeless DE candidates after a few runs
+    python optimize.py --resume     # Continue from optimize_checkpoint.pkl
+    python optimize.py --bench --bench-out bench.json   # Throughput benchmark
+    python optimize.py --parity     # Compare the port with game.js year by year (node)
+    python optimize.py --pareto --workers 32   # Pareto archive over the penalty terms
+    python optimize.py --pick p10=3,spread=0.5   # Re-weight the archive, no simulation
+    python optimize.py --surrogate --budget 200   # GP-assisted search instead of DE
 """
 
-import random, math, sys, json, re, copy, argparse
+import random, math, sys, json, re, copy, argparse, functools, time
+import collections, contextlib, itertools, multiprocessing, os, pickle
+import platform, subprocess, tracemalloc, csv, shutil
+import dataclasses
 from dataclasses import dataclass, field
 from typing import Optional
 from pathlib import Path
 
 import numpy as np
 try:
-    from scipy.optimize import differential_evolution
+    from scipy.optimize import differential_evolution, minimize
+    from scipy.linalg import cho_solve, solve_triangular
+    from scipy.special import ndtr
+    from scipy.stats.qmc import LatinHypercube
     HAS_SCIPY = True
 except ImportError:
     HAS_SCIPY = False
@@ -34,8 +53,9 @@ except ImportError:
 #  Simulation port  (mirrors game.js exactly)
 # ═══════════════════════════════════════════════════════════════
 
-WEATHERS = ['normal'] * 4 + ['drought'] * 2 + ['flood', 'bountiful', 'bountiful', 'normal']
+WEATHERS = ['normal'] * 5 + ['drought'] * 2 + ['flood'] + ['bountiful'] * 2   # getWeatherPool() order
 BUILDING_KEYS = ['granary', 'walls', 'temple', 'irrigation']
+GRANARY, WALLS, TEMPLE, IRRIGATION = range(len(BUILDING_KEYS))
 
 @dataclass
 class Params:
@@ -99,78 +119,167 @@ def make_personalities(p: 'Params') -> list:
     ]
 
 
+# ── Random tapes ──
+# Every game consumes a fixed row of uniform draws per year, one slot per
+# random decision, whichever branches it takes.  Candidates scored on the
+# same tapes therefore see the same luck (common random numbers), and both
+# engines give identical results on a shared tape.  Row 0 of a tape only
+# seeds the opening land price.
+(U_WEATHER, U_SELL, U_SELL_FRAC, U_FEED_JITTER, U_BUY, U_BUY_FRAC,
+ U_PLANT_JITTER, U_BUILD_0, U_BUILD_1, U_BUILD_2, U_BUILD_3, U_HARVEST,
+ U_RATS, U_IMM, U_PLAGUE, U_TEMPLE, U_LAND_PRICE, U_ROT, U_ATTACK,
+ U_THREAT, U_TRIBUTE_POP, U_TRIBUTE_GRAIN, U_TRIBUTE_ACRES, U_FLOOD,
+ U_FLOOD_ACRES, U_REVOLT, U_EVENT, U_EVENT_KIND, U_EVENT_SIZE,
+ U_EVENT_ACRES) = range(30)
+N_DRAWS = 30
+
+
+def make_tapes(n_personalities: int, n_runs: int, years: int, seed: int) -> np.ndarray:
+    """Uniform draws shaped (personality, run, year + 1, N_DRAWS)."""
+    rng = np.random.default_rng(seed)
+    return rng.random((n_personalities, n_runs, years + 1, N_DRAWS))
+
+@functools.lru_cache(maxsize=8)
+def common_tapes(n_personalities: int, n_runs: int, years: int, seed: int) -> np.ndarray:
+    """make_tapes, built once per process and shared read-only by every candidate."""
+    tapes = make_tapes(n_personalities, n_runs, years, seed)
+    tapes.setflags(write=False)
+    return tapes
+
+def _uniform_int(u: float, a: int, b: int) -> int:
+    """Map a uniform in [0, 1) to an integer in [a, b] (like randInt in game.js)."""
+    return a + int(u * (b - a + 1))
+
+
 def build_cost(key: str, count: int, p: Params) -> int:
-    costs = {
-        'granary':    (p.granary_base, p.granary_scale),
-        'walls':      (p.walls_base, p.walls_scale),
-        'temple':     (p.temple_base, p.temple_scale),
-        'irrigation': (p.irrigation_base, p.irrigation_scale),
-    }
-    base, scale = costs[key]
-    return base + count * scale
+    return getattr(p, key + '_base') + count * getattr(p, key + '_scale')
 
+def cost_table(p: Params, max_count: int) -> list:
+    """cost_table(p, n)[b][c] == build_cost(BUILDING_KEYS[b], c, p), for c <= n."""
+    return [[build_cost(key, c, p) for c in range(max_count + 1)] for key in BUILDING_KEYS]
 
-def simulate_game(params: Params, personality: Personality, years: int = 20,
-                  rng: Optional[random.Random] = None) -> dict:
-    """Run one full game, return summary statistics."""
-    if rng is None:
-        rng = random.Random()
 
-    ri = lambda a, b: rng.randint(a, b)
-    rf = rng.random
+# Phases of a simulated year, in the order they run.
+PHASES = ('decision', 'harvest', 'rats', 'immigration', 'plague', 'rot',
+          'loyalty', 'military', 'events', 'bookkeeping')
+
+class PhaseProfiler:
+    """Wall time and call counts per phase of simulate_game / simulate_batch.
+
+    The engines call lap(phase) at the end of each phase; the time since
+    the previous lap is charged to it.  A call is one game-year, so the
+    two engines' per-call costs are directly comparable.
+    """
+
+    def __init__(self):
+        self.seconds = dict.fromkeys(PHASES, 0.0)
+        self.calls = dict.fromkeys(PHASES, 0)
+        self._last = time.perf_counter()
+
+    def start(self):
+        self._last = time.perf_counter()
+
+    def lap(self, phase: str, n: int = 1):
+        now = time.perf_counter()
+        self.seconds[phase] += now - self._last
+        self.calls[phase] += n
+        self._last = now
+
+    def report(self):
+        total = sum(self.seconds.values()) or 1.0
+        print("\n  Phase profile (timer overhead included)")
+        print(f"  {'Phase':<12} {'Time':>9} {'Share':>7} {'Game-years':>11} {'us/call':>8}")
+        print(f"  {'-'*12} {'-'*9} {'-'*7} {'-'*11} {'-'*8}")
+        for phase in sorted(PHASES, key=self.seconds.get, reverse=True):
+            calls = self.calls[phase]
+            per_call = self.seconds[phase] / calls * 1e6 if calls else 0.0
+            print(f"  {phase:<12} {self.seconds[phase]:>8.3f}s {self.seconds[phase] / total:>6.1%} "
+                  f"{calls:>11,} {per_call:>8.3f}")
+        print(f"  {'total':<12} {total:>8.3f}s")
+
+
+def simulate_game(params: Params, personality: Personality, years: int = 20,
+                  rng: Optional[random.Random] = None, tape=None,
+                  keep_history: bool = True,
+                  profile: Optional['PhaseProfiler'] = None,
+                  trace: Optional[list] = None) -> dict:
+    """Run one full game, return summary statistics.
+
+    Random decisions are read from `tape` (years + 1 rows of N_DRAWS
+    uniforms, see make_tapes); without one a fresh tape is drawn from rng.
+    With keep_history=False the per-year histories are not collected and
+    come back as None.  A PhaseProfiler passed as `profile` is charged
+    with the time spent in each phase of every year.  If `trace` is a list,
+    the end-of-year state is appended to it every year (see run_parity).
+    """
+    if tape is None:
+        rng = rng or random.Random()
+        tape = [[rng.random() for _ in range(N_DRAWS)] for _ in range(years + 1)]
+    else:
+        tape = np.asarray(tape).tolist()
+    ri = _uniform_int
 
     pop = params.start_pop
     grain = params.start_grain_val
     acres = params.start_acres
-    land_price = ri(params.land_price_min, params.land_price_max)
+    land_price = ri(tape[0][U_LAND_PRICE], params.land_price_min, params.land_price_max)
     loyalty = 50
-    buildings = {k: 0 for k in BUILDING_KEYS}
+    # At most one building goes up per year, so `years` bounds every count
+    costs = cost_table(params, years)
+    build_order = [BUILDING_KEYS.index(k) for k in personality.build_priority]
+    buildings = [0] * len(BUILDING_KEYS)
     total_starved = 0
     avg_starved_pct = 0.0
-    pop_history = [pop]
-    grain_history = [grain]
+    pop_history = [pop] if keep_history else None
+    grain_history = [grain] if keep_history else None
     min_pop = pop
     plagues = 0
     attacks_lost = 0
     starvation_years = 0
+    years_played = 0
+    lap = profile.lap if profile is not None else None
+    if lap:
+        profile.start()
 
     for year in range(1, years + 1):
-        weather = rng.choice(WEATHERS)
+        u = tape[year]
+        weather = WEATHERS[int(u[U_WEATHER] * len(WEATHERS))]
         p = personality
 
         # ── AI decisions ──
-        jitter = lambda: 0.92 + rf() * 0.16
         gr = grain
         ac = acres
 
         sold = 0
-        if rf() > 0.6 and ac > pop * 5:
-            sold = int((ac - pop * 5) * (0.1 + rf() * 0.3))
+        if u[U_SELL] > 0.6 and ac > pop * 5:
+            sold = int((ac - pop * 5) * (0.1 + u[U_SELL_FRAC] * 0.3))
             sold = min(sold, ac - 1)
             gr += sold * land_price
 
-        feed = int(pop * params.feed_per_person * p.feed_ratio * jitter())
+        feed = int(pop * params.feed_per_person * p.feed_ratio * (0.92 + u[U_FEED_JITTER] * 0.16))
         feed = max(0, min(feed, gr))
         gr -= feed
 
         bought = 0
-        if rf() < p.land_bias and gr > land_price * 50:
-            bought = max(0, int((gr / land_price) * (0.1 + rf() * 0.25)))
+        if u[U_BUY] < p.land_bias and gr > land_price * 50:
+            bought = max(0, int((gr / land_price) * (0.1 + u[U_BUY_FRAC] * 0.25)))
             gr -= bought * land_price
 
         cur_ac = ac + bought - sold
         max_seed = int(gr * params.seed_rate)
         max_p = min(max_seed, pop * params.plant_per_person, cur_ac)
-        planted = max(0, min(int(max_p * p.plant_ratio * jitter()), max_p))
+        planted = max(0, min(int(max_p * p.plant_ratio * (0.92 + u[U_PLANT_JITTER] * 0.16)), max_p))
         gr -= planted // params.seed_rate
 
-        build_choice = None
-        for bk in p.build_priority:
-            cost = build_cost(bk, buildings[bk], params)
-            if gr >= cost and rf() < 0.45:
+        build_choice = -1
+        for rank, bk in enumerate(build_order):
+            if gr >= costs[bk][buildings[bk]] and u[U_BUILD_0 + rank] < 0.45:
                 build_choice = bk
                 break
 
+        if lap:
+            lap('decision')
+
         # ── Simulate year ──
         acres += bought - sold
         grain -= bought * land_price
@@ -178,36 +287,41 @@ def simulate_game(params: Params, personality: Personality, years: int = 20,
         grain -= feed
         grain -= planted // params.seed_rate
 
-        built_this = None
-        if build_choice:
-            cost = build_cost(build_choice, buildings[build_choice], params)
+        built_this = False
+        if build_choice >= 0:
+            cost = costs[build_choice][buildings[build_choice]]
             if grain >= cost:
                 grain -= cost
                 buildings[build_choice] += 1
-                built_this = build_choice
+                built_this = True
 
-        hy = ri(params.harvest_min, params.harvest_max)
+        hy = ri(u[U_HARVEST], params.harvest_min, params.harvest_max)
         if weather == 'drought':
             hy = max(1, hy - 2)
         elif weather == 'bountiful':
             hy += 1
         elif weather == 'flood':
             hy += 1
-        hy += min(4, buildings['irrigation'] // 2)
+        hy += min(4, buildings[IRRIGATION] // 2)
 
         th = planted * hy
         grain = max(0, grain)
 
+        if lap:
+            lap('harvest')
         rats = 0
-        rat_roll = ri(1, 5)
+        rat_roll = ri(u[U_RATS], 1, 5)
         if rat_roll % 2 == 0:
             rats = grain // rat_roll
-            rat_reduce = min(0.85, buildings['granary'] * 0.10)
+            rat_reduce = min(0.85, buildings[GRANARY] * 0.10)
             rats = int(rats * (1 - rat_reduce))
         grain = grain - rats + th
 
+        if lap:
+            lap('rats')
+
         # Immigration
-        base_imm = int(pop * (params.imm_base + rf() * params.imm_range))
+        base_imm = int(pop * (params.imm_base + u[U_IMM] * params.imm_range))
         if loyalty >= 75:
             base_imm = int(base_imm * 1.5)
         elif loyalty < 25:
@@ -228,24 +342,33 @@ def simulate_game(params: Params, personality: Personality, years: int = 20,
             starvation_years += 1
         pop += imm
 
+        if lap:
+            lap('immigration')
+
         # Plague
         plague = False
-        if rf() < params.plague_chance:
-            temple_block = min(0.85, buildings['temple'] * 0.10)
-            if rf() >= temple_block:
+        if u[U_PLAGUE] < params.plague_chance:
+            temple_block = min(0.85, buildings[TEMPLE] * 0.10)
+            if u[U_TEMPLE] >= temple_block:
                 pop = pop // 2
                 plague = True
                 plagues += 1
 
-        land_price = ri(params.land_price_min, params.land_price_max)
+        land_price = ri(u[U_LAND_PRICE], params.land_price_min, params.land_price_max)
+
+        if lap:
+            lap('plague')
 
         # Grain rot
         if grain > params.rot_threshold:
-            rot_rate = params.rot_rate_min + rf() * params.rot_rate_range
-            rot_reduce = min(0.80, buildings['granary'] * 0.10)
+            rot_rate = params.rot_rate_min + u[U_ROT] * params.rot_rate_range
+            rot_reduce = min(0.80, buildings[GRANARY] * 0.10)
             rot_rate *= (1 - rot_reduce)
             grain -= int((grain - params.rot_threshold) * rot_rate)
 
+        if lap:
+            lap('rot')
+
         # Loyalty
         loy_delta = 0
         if died == 0 and pop > 0:
@@ -258,23 +381,26 @@ def simulate_game(params: Params, personality: Personality, years: int = 20,
                 loy_delta -= 2
         if died > 0:
             loy_delta -= min(20, int(died / max(1, died + pop) * 30))
-        loy_delta += min(8, buildings['temple'] * 2)
+        loy_delta += min(8, buildings[TEMPLE] * 2)
         if plague:
             loy_delta -= 10
         if built_this:
             loy_delta += 4
         loyalty = max(0, min(100, loyalty + loy_delta))
 
+        if lap:
+            lap('loyalty')
+
         # Military threat
-        if not plague and rf() < params.attack_chance:
-            t_str = ri(50, 200 + year * 8)
-            defense = buildings['walls'] * 30 + pop * 0.01
+        if not plague and u[U_ATTACK] < params.attack_chance:
+            t_str = ri(u[U_THREAT], 50, 200 + year * 8)
+            defense = buildings[WALLS] * 30 + pop * 0.01
             if defense >= t_str:
                 loyalty = min(100, loyalty + 5)
             else:
-                t_pop = max(1, int(pop * (0.03 + rf() * 0.07)))
-                t_gr = int(grain * (0.05 + rf() * 0.10))
-                t_ac = min(ri(100, 500), max(0, acres - 1))
+                t_pop = max(1, int(pop * (0.03 + u[U_TRIBUTE_POP] * 0.07)))
+                t_gr = int(grain * (0.05 + u[U_TRIBUTE_GRAIN] * 0.10))
+                t_ac = min(ri(u[U_TRIBUTE_ACRES], 100, 500), max(0, acres - 1))
                 pop = max(1, pop - t_pop)
                 grain = max(0, grain - t_gr)
                 acres = max(1, acres - t_ac)
@@ -282,48 +408,69 @@ def simulate_game(params: Params, personality: Personality, years: int = 20,
                 attacks_lost += 1
 
         # Flood damage
-        if weather == 'flood' and rf() < params.flood_damage_chance:
-            lost = min(ri(200, 1200), max(0, acres - 1))
+        if weather == 'flood' and u[U_FLOOD] < params.flood_damage_chance:
+            lost = min(ri(u[U_FLOOD_ACRES], 200, 1200), max(0, acres - 1))
             acres -= lost
 
         # Revolt
-        if loyalty < params.revolt_loyalty_thresh and rf() < params.revolt_chance and not plague:
+        if loyalty < params.revolt_loyalty_thresh and u[U_REVOLT] < params.revolt_chance and not plague:
             r_loss = max(1, int(pop * 0.1))
             pop = max(1, pop - r_loss)
             loyalty = min(100, loyalty + 15)
 
+        if lap:
+            lap('military')
+
         # Random events (simplified: net effect)
-        if not plague and rf() < params.event_chance:
-            ev = ri(1, 8)
+        if not plague and u[U_EVENT] < params.event_chance:
+            ev = ri(u[U_EVENT_KIND], 1, 8)
+            size = u[U_EVENT_SIZE]
             if ev == 1:  # bandits
-                b_loss = int(grain * (0.03 + rf() * 0.07) * max(0.05, 1 - buildings['walls'] * 0.08))
+                b_loss = int(grain * (0.03 + size * 0.07) * max(0.05, 1 - buildings[WALLS] * 0.08))
                 grain = max(0, grain - b_loss)
             elif ev == 2:  # caravan
-                grain += ri(2000, 8000)
+                grain += ri(size, 2000, 8000)
             elif ev == 3:  # flood boundary
-                acres -= min(ri(300, 1500), max(0, acres - 1))
+                acres -= min(ri(size, 300, 1500), max(0, acres - 1))
             elif ev == 4:  # festival
-                pop += ri(50, 300)
+                pop += ri(size, 50, 300)
             elif ev == 5:  # locusts
-                grain = max(0, grain - int(th * (0.1 + rf() * 0.2)))
+                grain = max(0, grain - int(th * (0.1 + size * 0.2)))
             elif ev == 6:  # treasure
-                grain += ri(5000, 15000)
+                grain += ri(size, 5000, 15000)
             elif ev == 7:  # marriage
-                pop += ri(100, 500)
+                pop += ri(size, 100, 500)
             elif ev == 8:  # earthquake
-                active = [k for k in BUILDING_KEYS if buildings[k] > 0]
-                if active:
-                    buildings[rng.choice(active)] -= 1
+                standing = len(buildings) - buildings.count(0)
+                if standing:
+                    target = int(size * standing)   # the target-th standing building falls
+                    for b, count in enumerate(buildings):
+                        if count > 0:
+                            if target == 0:
+                                buildings[b] -= 1
+                                break
+                            target -= 1
                 else:
-                    acres -= min(ri(100, 500), max(0, acres - 1))
+                    acres -= min(ri(u[U_EVENT_ACRES], 100, 500), max(0, acres - 1))
 
+        if lap:
+            lap('events')
         pop = max(1, pop)
         grain = max(0, grain)
         acres = max(1, acres)
-        pop_history.append(pop)
-        grain_history.append(grain)
+        if keep_history:
+            pop_history.append(pop)
+            grain_history.append(grain)
         min_pop = min(min_pop, pop)
-
+        years_played += 1
+        if trace is not None:
+            trace.append({'year': year, 'weather': weather, 'pop': pop, 'grain': grain,
+                          'acres': acres, 'loyalty': loyalty, 'land_price': land_price,
+                          'buildings': list(buildings),
+                          'impeached': impeached})
+
+        if lap:
+            lap('bookkeeping')
         if impeached:
             break
 
@@ -338,11 +485,302 @@ def simulate_game(params: Params, personality: Personality, years: int = 20,
         'plagues': plagues,
         'attacks_lost': attacks_lost,
         'starvation_years': starvation_years,
-        'years_played': len(pop_history) - 1,
+        'years_played': years_played,
         'pop_history': pop_history,
         'grain_history': grain_history,
-        'buildings': dict(buildings),
-        'impeached': len(pop_history) - 1 < years,
+        'buildings': dict(zip(BUILDING_KEYS, buildings)),
+        'impeached': years_played < years,
+    }
+
+
+# ═══════════════════════════════════════════════════════════════
+#  Batch engine  (same rules as simulate_game, NumPy lockstep)
+# ═══════════════════════════════════════════════════════════════
+
+ENGINES = ('batch', 'python')
+
+WEATHER_NORMAL, WEATHER_DROUGHT, WEATHER_FLOOD, WEATHER_BOUNTIFUL = range(4)
+WEATHER_CODES = np.array([['normal', 'drought', 'flood', 'bountiful'].index(w)
+                          for w in WEATHERS])
+
+
+
+def _uniform_ints(u, a, b):
+    """Vectorised _uniform_int."""
+    return a + (u * (b - a + 1)).astype(np.int64)
+
+
+def simulate_batch(params: Params, personalities: list, tapes: np.ndarray,
+                   keep_history: bool = True,
+                   profile: Optional['PhaseProfiler'] = None) -> dict:
+    """Run every (personality, run) game of `tapes` in lockstep NumPy arrays.
+
+    `tapes` is shaped like make_tapes output; game (i, r) gives exactly the
+    result of simulate_game(params, personalities[i], tape=tapes[i, r]).
+    Returns the simulate_game summary fields as arrays of shape
+    (len(personalities), n_runs).  Histories get a trailing year axis and
+    are zero after 'years_played' (None with keep_history=False);
+    'buildings' maps each key to an array.  `profile` is charged per
+    phase as in simulate_game, one call per active game and year.
+    """
+    n_runs, years = tapes.shape[1], tapes.shape[2] - 1
+    n = len(personalities) * n_runs
+    tapes = tapes.reshape(n, years + 1, N_DRAWS)
+    feed_ratio = np.repeat([pers.feed_ratio for pers in personalities], n_runs)
+    land_bias = np.repeat([pers.land_bias for pers in personalities], n_runs)
+    plant_ratio = np.repeat([pers.plant_ratio for pers in personalities], n_runs)
+    priority = np.repeat([[BUILDING_KEYS.index(k) for k in pers.build_priority]
+                          for pers in personalities], n_runs, axis=0)
+    cost_base = np.array([params.granary_base, params.walls_base,
+                          params.temple_base, params.irrigation_base], dtype=np.int64)
+    cost_scale = np.array([params.granary_scale, params.walls_scale,
+                           params.temple_scale, params.irrigation_scale], dtype=np.int64)
+
+    pop = np.full(n, params.start_pop, dtype=np.int64)
+    grain = np.full(n, params.start_grain_val, dtype=np.int64)
+    acres = np.full(n, params.start_acres, dtype=np.int64)
+    land_price = _uniform_ints(tapes[:, 0, U_LAND_PRICE], params.land_price_min, params.land_price_max)
+    loyalty = np.full(n, 50, dtype=np.int64)
+    buildings = np.zeros((n, len(BUILDING_KEYS)), dtype=np.int64)
+    total_starved = np.zeros(n, dtype=np.int64)
+    avg_starved_pct = np.zeros(n)
+    if keep_history:
+        pop_history = np.zeros((n, years + 1), dtype=np.int64)
+        grain_history = np.zeros((n, years + 1), dtype=np.int64)
+        pop_history[:, 0] = pop
+        grain_history[:, 0] = grain
+    min_pop = pop.copy()
+    plagues = np.zeros(n, dtype=np.int64)
+    attacks_lost = np.zeros(n, dtype=np.int64)
+    starvation_years = np.zeros(n, dtype=np.int64)
+    years_played = np.zeros(n, dtype=np.int64)
+    active = np.ones(n, dtype=bool)
+    lap = profile.lap if profile is not None else None
+    if lap:
+        profile.start()
+
+    for year in range(1, years + 1):
+        idx = np.flatnonzero(active)
+        if idx.size == 0:
+            break
+        u = tapes[idx, year]
+        m = idx.size
+        rows = np.arange(m)
+
+        pp, gg, ac, lp = pop[idx], grain[idx], acres[idx], land_price[idx]
+        loy, bld = loyalty[idx], buildings[idx]
+        weather = WEATHER_CODES[(u[:, U_WEATHER] * len(WEATHERS)).astype(np.intp)]
+
+        # ── AI decisions ──
+        gr = gg.copy()
+        selling = (u[:, U_SELL] > 0.6) & (ac > pp * 5)
+        sold = ((ac - pp * 5) * (0.1 + u[:, U_SELL_FRAC] * 0.3)).astype(np.int64)
+        sold = np.where(selling, np.minimum(sold, ac - 1), 0)
+        gr += sold * lp
+
+        feed = (pp * params.feed_per_person * feed_ratio[idx]
+                * (0.92 + u[:, U_FEED_JITTER] * 0.16)).astype(np.int64)
+        feed = np.maximum(0, np.minimum(feed, gr))
+        gr -= feed
+
+        buying = (u[:, U_BUY] < land_bias[idx]) & (gr > lp * 50)
+        bought = np.maximum(0, ((gr / lp) * (0.1 + u[:, U_BUY_FRAC] * 0.25)).astype(np.int64))
+        bought = np.where(buying, bought, 0)
+        gr -= bought * lp
+
+        cur_ac = ac + bought - sold
+        max_seed = (gr * params.seed_rate).astype(np.int64)
+        max_p = np.minimum(np.minimum(max_seed, pp * params.plant_per_person), cur_ac)
+        planted = (max_p * plant_ratio[idx] * (0.92 + u[:, U_PLANT_JITTER] * 0.16)).astype(np.int64)
+        planted = np.maximum(0, np.minimum(planted, max_p))
+        gr -= planted // params.seed_rate
+
+        build_choice = np.full(m, -1)
+        prio = priority[idx]
+        for rank in range(len(BUILDING_KEYS)):
+            bk = prio[:, rank]
+            cost = cost_base[bk] + bld[rows, bk] * cost_scale[bk]
+            pick = (build_choice < 0) & (gr >= cost) & (u[:, U_BUILD_0 + rank] < 0.45)
+            build_choice[pick] = bk[pick]
+
+        if lap:
+            lap('decision', m)
+
+        # ── Simulate year ──
+        ac = ac + bought - sold
+        gg = gg - bought * lp + sold * lp - feed - planted // params.seed_rate
+
+        has_choice = build_choice >= 0
+        bk = np.where(has_choice, build_choice, 0)
+        cost = cost_base[bk] + bld[rows, bk] * cost_scale[bk]
+        built = has_choice & (gg >= cost)
+        gg -= np.where(built, cost, 0)
+        bld[rows[built], bk[built]] += 1
+
+        hy = _uniform_ints(u[:, U_HARVEST], params.harvest_min, params.harvest_max)
+        hy = np.where(weather == WEATHER_DROUGHT, np.maximum(1, hy - 2), hy)
+        hy += (weather == WEATHER_BOUNTIFUL) | (weather == WEATHER_FLOOD)
+        hy += np.minimum(4, bld[:, IRRIGATION] // 2)
+
+        th = planted * hy
+        gg = np.maximum(0, gg)
+
+        if lap:
+            lap('harvest', m)
+        rat_roll = _uniform_ints(u[:, U_RATS], 1, 5)
+        rat_reduce = np.minimum(0.85, bld[:, GRANARY] * 0.10)
+        rats = ((gg // rat_roll) * (1 - rat_reduce)).astype(np.int64)
+        rats = np.where(rat_roll % 2 == 0, rats, 0)
+        gg = gg - rats + th
+
+        if lap:
+            lap('rats', m)
+
+        # Immigration
+        base_imm = (pp * (params.imm_base + u[:, U_IMM] * params.imm_range)).astype(np.int64)
+        base_imm = np.where(loy >= 75, (base_imm * 1.5).astype(np.int64),
+                            np.where(loy < 25, np.maximum(1, (base_imm * 0.3).astype(np.int64)),
+                                     base_imm))
+        imm = np.maximum(1, base_imm)
+
+        # Starvation
+        fed_count = (feed / params.feed_per_person).astype(np.int64)
+        starving = pp > fed_count
+        died = np.where(starving, pp - fed_count, 0)
+        impeached = starving & (died > 0.45 * pp)
+        total_starved[idx] += died
+        avg = avg_starved_pct[idx]
+        avg_starved_pct[idx] = np.where(
+            starving, ((year - 1) * avg + died * 100 / np.maximum(1, pp)) / year, avg)
+        pp = np.where(starving, fed_count, pp)
+        starvation_years[idx] += starving
+        pp = pp + imm
+
+        if lap:
+            lap('immigration', m)
+
+        # Plague
+        temple_block = np.minimum(0.85, bld[:, TEMPLE] * 0.10)
+        plague = (u[:, U_PLAGUE] < params.plague_chance) & (u[:, U_TEMPLE] >= temple_block)
+        pp = np.where(plague, pp // 2, pp)
+        plagues[idx] += plague
+
+        lp = _uniform_ints(u[:, U_LAND_PRICE], params.land_price_min, params.land_price_max)
+
+        if lap:
+            lap('plague', m)
+
+        # Grain rot
+        rot_rate = params.rot_rate_min + u[:, U_ROT] * params.rot_rate_range
+        rot_rate *= (1 - np.minimum(0.80, bld[:, GRANARY] * 0.10))
+        rotting = gg > params.rot_threshold
+        gg = gg - np.where(rotting, ((gg - params.rot_threshold) * rot_rate).astype(np.int64), 0)
+
+        if lap:
+            lap('rot', m)
+
+        # Loyalty
+        f_rat = feed / np.maximum(1, pp * params.feed_per_person)
+        fed_delta = np.where(f_rat >= 1.2, 8, np.where(f_rat >= 0.9, 3, -2))
+        loy_delta = np.where((died == 0) & (pp > 0), fed_delta, 0)
+        starve_hit = np.minimum(20, (died / np.maximum(1, died + pp) * 30).astype(np.int64))
+        loy_delta -= np.where(died > 0, starve_hit, 0)
+        loy_delta += np.minimum(8, bld[:, TEMPLE] * 2)
+        loy_delta -= plague * 10
+        loy_delta += built * 4
+        loy = np.clip(loy + loy_delta, 0, 100)
+
+        if lap:
+            lap('loyalty', m)
+
+        # Military threat
+        attack = ~plague & (u[:, U_ATTACK] < params.attack_chance)
+        t_str = _uniform_ints(u[:, U_THREAT], 50, 200 + year * 8)
+        defended = attack & (bld[:, WALLS] * 30 + pp * 0.01 >= t_str)
+        lost = attack & ~defended
+        loy = np.where(defended, np.minimum(100, loy + 5), loy)
+        t_pop = np.maximum(1, (pp * (0.03 + u[:, U_TRIBUTE_POP] * 0.07)).astype(np.int64))
+        t_gr = (gg * (0.05 + u[:, U_TRIBUTE_GRAIN] * 0.10)).astype(np.int64)
+        t_ac = np.minimum(_uniform_ints(u[:, U_TRIBUTE_ACRES], 100, 500), np.maximum(0, ac - 1))
+        pp = np.where(lost, np.maximum(1, pp - t_pop), pp)
+        gg = np.where(lost, np.maximum(0, gg - t_gr), gg)
+        ac = np.where(lost, np.maximum(1, ac - t_ac), ac)
+        loy = np.where(lost, np.maximum(0, loy - 8), loy)
+        attacks_lost[idx] += lost
+
+        # Flood damage
+        flooded = (weather == WEATHER_FLOOD) & (u[:, U_FLOOD] < params.flood_damage_chance)
+        flood_lost = np.minimum(_uniform_ints(u[:, U_FLOOD_ACRES], 200, 1200), np.maximum(0, ac - 1))
+        ac = ac - np.where(flooded, flood_lost, 0)
+
+        # Revolt
+        revolt = ((loy < params.revolt_loyalty_thresh)
+                  & (u[:, U_REVOLT] < params.revolt_chance) & ~plague)
+        r_loss = np.maximum(1, (pp * 0.1).astype(np.int64))
+        pp = np.where(revolt, np.maximum(1, pp - r_loss), pp)
+        loy = np.where(revolt, np.minimum(100, loy + 15), loy)
+
+        if lap:
+            lap('military', m)
+
+        # Random events (simplified: net effect)
+        ev = np.where(~plague & (u[:, U_EVENT] < params.event_chance),
+                      _uniform_ints(u[:, U_EVENT_KIND], 1, 8), 0)
+        size = u[:, U_EVENT_SIZE]
+        b_loss = (gg * (0.03 + size * 0.07)
+                  * np.maximum(0.05, 1 - bld[:, WALLS] * 0.08)).astype(np.int64)
+        gg = np.where(ev == 1, np.maximum(0, gg - b_loss), gg)                        # bandits
+        gg = gg + np.where(ev == 2, _uniform_ints(size, 2000, 8000), 0)                 # caravan
+        ac = ac - np.where(ev == 3, np.minimum(_uniform_ints(size, 300, 1500),
+                                               np.maximum(0, ac - 1)), 0)              # flood boundary
+        pp = pp + np.where(ev == 4, _uniform_ints(size, 50, 300), 0)                    # festival
+        locusts = (th * (0.1 + size * 0.2)).astype(np.int64)
+        gg = np.where(ev == 5, np.maximum(0, gg - locusts), gg)                        # locusts
+        gg = gg + np.where(ev == 6, _uniform_ints(size, 5000, 15000), 0)                # treasure
+        pp = pp + np.where(ev == 7, _uniform_ints(size, 100, 500), 0)                   # marriage
+        quake = ev == 8                                                                # earthquake
+        standing = bld > 0
+        n_standing = standing.sum(axis=1)
+        target = (size * n_standing).astype(np.int64)
+        hit = standing & (np.cumsum(standing, axis=1) == (target + 1)[:, None])
+        bld -= hit & (quake & (n_standing > 0))[:, None]
+        quake_acres = np.minimum(_uniform_ints(u[:, U_EVENT_ACRES], 100, 500), np.maximum(0, ac - 1))
+        ac = ac - np.where(quake & (n_standing == 0), quake_acres, 0)
+
+        if lap:
+            lap('events', m)
+        pp = np.maximum(1, pp)
+        gg = np.maximum(0, gg)
+        ac = np.maximum(1, ac)
+
+        pop[idx], grain[idx], acres[idx], land_price[idx] = pp, gg, ac, lp
+        loyalty[idx], buildings[idx] = loy, bld
+        if keep_history:
+            pop_history[idx, year] = pp
+            grain_history[idx, year] = gg
+        min_pop[idx] = np.minimum(min_pop[idx], pp)
+        years_played[idx] += 1
+        active[idx[impeached]] = False
+        if lap:
+            lap('bookkeeping', m)
+
+    shape = (len(personalities), n_runs)
+    return {
+        'final_pop': pop.reshape(shape),
+        'final_grain': grain.reshape(shape),
+        'final_acres': acres.reshape(shape),
+        'min_pop': min_pop.reshape(shape),
+        'total_starved': total_starved.reshape(shape),
+        'avg_starved_pct': avg_starved_pct.reshape(shape),
+        'loyalty': loyalty.reshape(shape),
+        'plagues': plagues.reshape(shape),
+        'attacks_lost': attacks_lost.reshape(shape),
+        'starvation_years': starvation_years.reshape(shape),
+        'years_played': years_played.reshape(shape),
+        'pop_history': pop_history.reshape(shape + (years + 1,)) if keep_history else None,
+        'grain_history': grain_history.reshape(shape + (years + 1,)) if keep_history else None,
+        'buildings': {k: buildings[:, i].reshape(shape) for i, k in enumerate(BUILDING_KEYS)},
+        'impeached': years_played.reshape(shape) < years,
     }
 
 
@@ -350,109 +788,151 @@ def simulate_game(params: Params, personality: Personality, years: int = 20,
 #  Fitness function
 # ═══════════════════════════════════════════════════════════════
 
+# What the fitness reads from each run, and how it is stored.
+RUN_COLUMNS = {
+    'final_pop': np.int64,
+    'starvation_years': np.int64,
+    'years_played': np.int64,
+    'impeached': bool,
+}
+RUN_KEYS = tuple(RUN_COLUMNS)
+
+def _play_python(params: Params, personalities: list, tapes: np.ndarray,
+                 profile: Optional[PhaseProfiler] = None) -> dict:
+    """simulate_game over every tape, streaming each result straight into
+    preallocated (P, R) columns instead of keeping the run dicts."""
+    years = tapes.shape[2] - 1
+    runs = {k: np.empty(tapes.shape[:2], dtype=dtype) for k, dtype in RUN_COLUMNS.items()}
+    for i, pers in enumerate(personalities):
+        for j, tape in enumerate(tapes[i]):
+            r = simulate_game(params, pers, years=years, tape=tape, keep_history=False,
+                              profile=profile)
+            for k in RUN_KEYS:
+                runs[k][i, j] = r[k]
+    return runs
+
+
+def run_games(params: Params, personalities: list, tapes: np.ndarray,
+              engine: str = 'batch', profile: Optional[PhaseProfiler] = None) -> dict:
+    """Play every (personality, run) game on `tapes`; RUN_KEYS arrays (P, R).
+
+    engine='batch' runs every game in lockstep with simulate_batch;
+    engine='python' steps each game with the reference simulate_game.
+    Both give identical results.  `profile` is handed to the engine.
+    """
+    if engine == 'batch':
+        runs = simulate_batch(params, personalities, tapes, keep_history=False, profile=profile)
+        return {k: runs[k] for k in RUN_KEYS}
+    if engine == 'python':
+        return _play_python(params, personalities, tapes, profile)
+    raise ValueError(f"unknown engine {engine!r} (expected one of {ENGINES})")
+
+
+# Fitness components, in the order _balance_metrics adds them up.
+PENALTIES = ('median', 'p10', 'worst', 'impeach', 'spread', 'challenge', 'p90')
+
+def _balance_metrics(finals, impeached, starve_frac, start: int) -> dict:
+    """Balance metrics and fitness from per-run arrays shaped (..., P, R).
+
+    Any leading axes are batch axes (e.g. bootstrap resamples) and are
+    kept in every returned array.  'margins' holds the PENALTIES terms
+    before clipping at zero (negative = slack left on that criterion) on a
+    trailing axis, 'penalties' the clipped terms, and 'fitness' their sum.
+    """
+    survival = finals / start
+    all_survival = survival.reshape(survival.shape[:-2] + (-1,))
+    medians = np.median(finals, axis=-1)
+    starve_medians = np.median(starve_frac, axis=-1)
+
+    m = {
+        'personality_medians': medians,
+        'personality_impeach_rates': impeached.mean(axis=-1),
+        'personality_starve_years': starve_medians,
+        'global_median_ratio': np.median(all_survival, axis=-1),
+        'global_p10_ratio': np.percentile(all_survival, 10, axis=-1),
+        'global_p90_ratio': np.percentile(all_survival, 90, axis=-1),
+        'worst_personality_ratio': medians.min(axis=-1) / start,
+        'best_personality_ratio': medians.max(axis=-1) / start,
+        'overall_impeach_rate': (finals <= 1).mean(axis=(-2, -1)),
+        'avg_starve_frac': starve_medians.mean(axis=-1),
+    }
+    m['spread'] = m['best_personality_ratio'] - m['worst_personality_ratio']
+    m['max_impeach_rate'] = m['personality_impeach_rates'].max(axis=-1)
+
+    # ── Fitness components (penalties — lower is better) ──
+    median_ratio = m['global_median_ratio']
+    margins = [
+        # 1. Median survival should be 40-80% of starting pop
+        np.where(median_ratio < 0.40, (0.40 - median_ratio) * 200,   # heavy penalty for die-off
+                 np.where(median_ratio > 1.5, (median_ratio - 1.5) * 30,   # mild: too easy
+                          -np.minimum(median_ratio - 0.40, 1.5 - median_ratio) * 30)),
+        # 2. 10th percentile (worst runs) should still have ≥ 15% survival
+        (0.15 - m['global_p10_ratio']) * 150,
+        # 3. No personality should be a death sentence (worst median ≥ 25% of start)
+        (0.25 - m['worst_personality_ratio']) * 180,
+        # 4. Impeachment rate should be low (< 10%)
+        (m['max_impeach_rate'] - 0.10) * 100,
+        # 5. Personality spread: not too wide (all strategies roughly viable)
+        (m['spread'] - 0.6) * 50,
+        # 6. Some challenge: at least 15% of runs should have ≥1 starvation year
+        (0.10 - m['avg_starve_frac']) * 40,   # too easy
+        # 7. 90th percentile shouldn't be absurdly high (runaway growth)
+        (m['global_p90_ratio'] - 3.0) * 20,
+    ]
+    penalties = [np.maximum(0.0, x) for x in margins]
+    m['margins'] = np.stack(margins, axis=-1)
+    m['penalties'] = np.stack(penalties, axis=-1)
+    m['fitness'] = sum(penalties)
+    return m
+
+
+def _starve_fracs(runs: dict) -> np.ndarray:
+    return runs['starvation_years'] / np.maximum(1, runs['years_played'])
+
+
+def fitness_from_runs(params: Params, names: list, runs: dict) -> dict:
+    """Summary stats (see evaluate_params) for per-run arrays from run_games."""
+    start = params.start_pop
+    m = _balance_metrics(runs['final_pop'], runs['impeached'], _starve_fracs(runs), start)
+    medians = m['personality_medians'].tolist()
+    impeach_rates = m['personality_impeach_rates'].tolist()
+    starve_years = m['personality_starve_years'].tolist()
+
+    stats = {k: float(m[k]) for k in (
+        'fitness', 'global_median_ratio', 'global_p10_ratio', 'global_p90_ratio',
+        'worst_personality_ratio', 'best_personality_ratio', 'spread',
+        'max_impeach_rate', 'overall_impeach_rate', 'avg_starve_frac')}
+    stats['penalties'] = dict(zip(PENALTIES, m['penalties'].tolist()))
+    stats['margins'] = dict(zip(PENALTIES, m['margins'].tolist()))
+    stats['per_personality'] = {
+        name: {
+            'median_pop': medians[i],
+            'median_survival': medians[i] / start,
+            'impeach_rate': impeach_rates[i],
+            'starve_year_frac': starve_years[i],
+        }
+        for i, name in enumerate(names)
+    }
+    return stats
+
+
 def evaluate_params(params: Params, n_runs: int = 80, years: int = 20,
-                    seed: int = 42, verbose: bool = False) -> dict:
+                    seed: int = 42, verbose: bool = False,
+                    engine: str = 'batch', tapes: Optional[np.ndarray] = None,
+                    profile: Optional[PhaseProfiler] = None) -> dict:
     """
     Run n_runs simulations per AI personality, gather statistics,
     and compute a single scalar fitness (lower = better).
+
+    Games read their luck from `tapes` (default: the common tapes for
+    n_runs/years/seed), so every parameter vector faces the same draws.
     """
-    rng = random.Random(seed)
     personalities = make_personalities(params)
-    per_personality = {}
+    if tapes is None:
+        tapes = common_tapes(len(personalities), n_runs, years, seed)
 
-    for pers in personalities:
-        results = []
-        for _ in range(n_runs):
-            r = simulate_game(params, pers, years=years,
-                              rng=random.Random(rng.randint(0, 2**31)))
-            results.append(r)
-        per_personality[pers.name] = results
-
-    # ── Aggregate metrics ──
-    start = params.start_pop
-    all_final_pops = []
-    all_survival_ratios = []
-    personality_medians = {}
-    personality_impeach_rates = {}
-    personality_starve_years = {}
-
-    for name, runs in per_personality.items():
-        finals = [r['final_pop'] for r in runs]
-        survival = [r['final_pop'] / start for r in runs]
-        impeach_rate = sum(1 for r in runs if r['impeached']) / len(runs)
-        starve_yrs = [r['starvation_years'] / max(1, r['years_played']) for r in runs]
-        med = float(np.median(finals))
-
-        personality_medians[name] = med
-        personality_impeach_rates[name] = impeach_rate
-        personality_starve_years[name] = float(np.median(starve_yrs))
-        all_final_pops.extend(finals)
-        all_survival_ratios.extend(survival)
-
-    global_median_ratio = float(np.median(all_survival_ratios))
-    global_p10_ratio = float(np.percentile(all_survival_ratios, 10))
-    global_p90_ratio = float(np.percentile(all_survival_ratios, 90))
-    worst_personality_ratio = min(personality_medians.values()) / start
-    best_personality_ratio = max(personality_medians.values()) / start
-    spread = best_personality_ratio - worst_personality_ratio
-    max_impeach = max(personality_impeach_rates.values())
-    overall_impeach = sum(1 for r in all_final_pops if r <= 1) / len(all_final_pops)
-    avg_starve_frac = float(np.mean(list(personality_starve_years.values())))
-
-    # ── Fitness components (penalties — lower is better) ──
-    penalty = 0.0
-
-    # 1. Median survival should be 40-80% of starting pop
-    if global_median_ratio < 0.40:
-        penalty += (0.40 - global_median_ratio) * 200  # heavy penalty for die-off
-    elif global_median_ratio > 1.5:
-        penalty += (global_median_ratio - 1.5) * 30    # mild: too easy
-
-    # 2. 10th percentile (worst runs) should still have ≥ 15% survival
-    if global_p10_ratio < 0.15:
-        penalty += (0.15 - global_p10_ratio) * 150
-
-    # 3. No personality should be a death sentence (worst median ≥ 25% of start)
-    if worst_personality_ratio < 0.25:
-        penalty += (0.25 - worst_personality_ratio) * 180
-
-    # 4. Impeachment rate should be low (< 10%)
-    if max_impeach > 0.10:
-        penalty += (max_impeach - 0.10) * 100
-
-    # 5. Personality spread: not too wide (all strategies roughly viable)
-    if spread > 0.6:
-        penalty += (spread - 0.6) * 50
-
-    # 6. Some challenge: at least 15% of runs should have ≥1 starvation year
-    if avg_starve_frac < 0.10:
-        penalty += (0.10 - avg_starve_frac) * 40  # too easy
-
-    # 7. 90th percentile shouldn't be absurdly high (runaway growth)
-    if global_p90_ratio > 3.0:
-        penalty += (global_p90_ratio - 3.0) * 20
-
-    stats = {
-        'fitness': penalty,
-        'global_median_ratio': global_median_ratio,
-        'global_p10_ratio': global_p10_ratio,
-        'global_p90_ratio': global_p90_ratio,
-        'worst_personality_ratio': worst_personality_ratio,
-        'best_personality_ratio': best_personality_ratio,
-        'spread': spread,
-        'max_impeach_rate': max_impeach,
-        'overall_impeach_rate': overall_impeach,
-        'avg_starve_frac': avg_starve_frac,
-        'per_personality': {
-            name: {
-                'median_pop': personality_medians[name],
-                'median_survival': personality_medians[name] / start,
-                'impeach_rate': personality_impeach_rates[name],
-                'starve_year_frac': personality_starve_years[name],
-            }
-            for name in personality_medians
-        },
-    }
+    runs = run_games(params, personalities, tapes, engine, profile)
+    stats = fitness_from_runs(params, [pers.name for pers in personalities], runs)
 
     if verbose:
         print_stats(stats, params)
@@ -473,6 +953,8 @@ def print_stats(stats: dict, params: Params):
     print(f"  Personality spread:        {stats['spread']:.2%}")
     print(f"  Max impeach rate:          {stats['max_impeach_rate']:.1%}")
     print(f"  Avg starvation fraction:   {stats['avg_starve_frac']:.1%}")
+    if 'penalties' in stats:
+        print("  Penalties:  " + '  '.join(f"{k}={v:.2f}" for k, v in stats['penalties'].items()))
     print()
     print(f"  {'Personality':<16} {'Med.Pop':>8} {'Surv%':>7} {'Impeach':>8} {'StarveYr':>9}")
     print(f"  {'-'*16} {'-'*8} {'-'*7} {'-'*8} {'-'*9}")
@@ -547,58 +1029,1010 @@ def params_to_vec(p: Params) -> list:
     """Extract search-space values from a Params object."""
     return [getattr(p, name) for name, *_ in SEARCH_SPACE]
 
-def objective(vec):
+@dataclass
+class EvalConfig:
+    """How the optimizer scores each candidate vector."""
+    n_runs: int = 50
+    years: int = 20
+    seed: int = 42
+    engine: str = 'batch'
+    race: bool = False
+
+
+# ── Racing ──
+# A DE trial vector only survives if it beats its target, so one that cannot
+# even beat the population's worst member is wasted work.  Racing scores a
+# candidate in growing stages of runs and stops as soon as a bootstrap lower
+# bound on its fitness is above that bar.  Candidates that survive every
+# stage get exactly the full evaluate_params result.
+
+RACE_STAGES = (0.2, 0.5, 1.0)   # cumulative share of n_runs played per stage
+RACE_CONFIDENCE = 0.95
+RACE_BOOTSTRAP = 200
+
+EVAL_COUNTERS = collections.Counter()   # candidates / sims / sims_saved / rejected
+_race_threshold = math.inf              # worst energy of the current population
+
+def _race_lower_bound(params: Params, runs: dict, rng: np.random.Generator) -> float:
+    """Lower confidence bound on the fitness, bootstrapping runs per personality."""
+    n_pers, n = runs['final_pop'].shape
+    pick = rng.integers(0, n, size=(RACE_BOOTSTRAP, n_pers, n))
+    resample = lambda a: np.take_along_axis(a[None], pick, axis=-1)
+    m = _balance_metrics(resample(runs['final_pop']), resample(runs['impeached']),
+                         resample(_starve_fracs(runs)), params.start_pop)
+    return float(np.quantile(m['fitness'], 1 - RACE_CONFIDENCE))
+
+def race_params(params: Params, threshold: float, config: EvalConfig) -> dict:
+    """Score params in RACE_STAGES, giving up once they cannot beat threshold.
+
+    The returned stats carry 'runs_used'; a rejected candidate's fitness is
+    its partial estimate or, if higher, the lower bound it was rejected on --
+    above the threshold either way, so it never looks better than the
+    population it lost to.
+    """
+    personalities = make_personalities(params)
+    tapes = common_tapes(len(personalities), config.n_runs, config.years, config.seed)
+    rng = np.random.default_rng(config.seed)
+    parts, done, bound = [], 0, -math.inf
+    for share in RACE_STAGES:
+        stop = min(config.n_runs, max(1, math.ceil(config.n_runs * share)))
+        if stop <= done:
+            continue
+        parts.append(run_games(params, personalities, tapes[:, done:stop], config.engine))
+        done = stop
+        runs = {k: np.concatenate([part[k] for part in parts], axis=1) for k in RUN_KEYS}
+        if done < config.n_runs:
+            bound = _race_lower_bound(params, runs, rng)
+            if bound > threshold:
+                break
+    stats = fitness_from_runs(params, [pers.name for pers in personalities], runs)
+    if done < config.n_runs:
+        stats['fitness'] = max(stats['fitness'], bound)
+    stats['runs_used'] = done
+    return stats
+
+def score_params(params: Params, config: EvalConfig, full: bool = False) -> dict:
+    """evaluate_params (or race_params) for the optimizer, updating EVAL_COUNTERS.
+
+    full=True never races, for callers that need complete stats.
+    """
+    n_pers = len(make_personalities(params))
+    if config.race and not full and math.isfinite(_race_threshold):
+        stats = race_params(params, _race_threshold, config)
+    else:
+        stats = evaluate_params(params, n_runs=config.n_runs, years=config.years,
+                                seed=config.seed, engine=config.engine)
+        stats['runs_used'] = config.n_runs
+    EVAL_COUNTERS['candidates'] += 1
+    EVAL_COUNTERS['sims'] += stats['runs_used'] * n_pers
+    EVAL_COUNTERS['sims_saved'] += (config.n_runs - stats['runs_used']) * n_pers
+    EVAL_COUNTERS['rejected'] += stats['runs_used'] < config.n_runs
+    return stats
+
+def race_summary() -> str:
+    c = EVAL_COUNTERS
+    total = c['sims'] + c['sims_saved']
+    return (f"rejected {c['rejected']:,} of {c['candidates']:,} candidates early, "
+            f"saving {c['sims_saved']:,} of {total:,} simulations "
+            f"({c['sims_saved'] / max(1, total):.0%})")
+
+
+class FitnessCache:
+    """Memo of optimizer stats keyed on the Params a vector rounds to.
+
+    vec_to_params rounds the integer parameters, so many DE trial vectors
+    collapse onto the same Params; each is simulated once and shared by
+    objective, callback_progress and the final report.  Raced (partial)
+    stats answer later objective calls too -- their fitness is at least the
+    bound they were rejected on, and the race threshold only ever falls --
+    but never a request for full stats.
+    """
+
+    def __init__(self):
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(params: Params, config: EvalConfig) -> tuple:
+        # Floats are rounded so a vector that went through DE's [0, 1]
+        # rescaling (e.g. a resumed population) still finds its entry.  Both
+        # engines give identical stats, so the engine is not part of the key.
+        values = tuple(round(v, 12) if isinstance(v, float) else v
+                       for v in dataclasses.astuple(params))
+        return values, config.n_runs, config.years, config.seed
+
+    def get(self, params: Params, config: EvalConfig, full: bool = False) -> Optional[dict]:
+        stats = self.entries.get(self.key(params, config))
+        if stats is not None and (not full or stats['runs_used'] == config.n_runs):
+            self.hits += 1
+            return stats
+        self.misses += 1
+        return None
+
+    def put(self, params: Params, config: EvalConfig, stats: dict):
+        self.entries[self.key(params, config)] = stats
+
+    def score(self, params: Params, config: EvalConfig, full: bool = False) -> dict:
+        stats = self.get(params, config, full)
+        if stats is None:
+            stats = score_params(params, config, full)
+            self.put(params, config, stats)
+        return stats
+
+    def summary(self) -> str:
+        lookups = self.hits + self.misses
+        return (f"{self.hits:,} hits / {self.misses:,} misses "
+                f"({self.hits / max(1, lookups):.0%} hit rate), {len(self.entries):,} entries")
+
+FITNESS_CACHE = FitnessCache()
+
+
+def objective(vec, config: EvalConfig = EvalConfig()):
     """Objective function for the optimizer (minimize)."""
-    p = vec_to_params(vec)
-    stats = evaluate_params(p, n_runs=50, years=20, seed=42)
-    return stats['fitness']
+    return FITNESS_CACHE.score(vec_to_params(vec), config)['fitness']
 
-def callback_progress(xk, convergence):
+def callback_progress(intermediate_result, config: EvalConfig = EvalConfig()):
     """Progress callback for differential_evolution."""
-    p = vec_to_params(xk)
-    stats = evaluate_params(p, n_runs=50, years=20, seed=42)
+    global _race_threshold
+    _race_threshold = float(np.max(intermediate_result.population_energies))
+    p = vec_to_params(intermediate_result.x)
+    stats = FITNESS_CACHE.score(p, config, full=True)
     print(f"  [DE] fitness={stats['fitness']:.3f}  "
           f"med_surv={stats['global_median_ratio']:.1%}  "
           f"worst={stats['worst_personality_ratio']:.1%}  "
           f"feed={p.feed_per_person:.1f}  "
           f"plague={p.plague_chance:.3f}")
+    print(f"  [cache] {FITNESS_CACHE.summary()}")
+    if config.race:
+        print(f"  [race] {race_summary()}")
+
+
+# ── Parallel population evaluation ──
+
+_worker_config: Optional[EvalConfig] = None   # installed once per pool process
 
+def _init_worker(config: EvalConfig):
+    global _worker_config
+    _worker_config = config
 
-def run_optimization(max_iter: int = 40, pop_size: int = 20):
+def _pool_score(task):
+    """Score one (vector, race threshold) inside a pool worker.
+
+    Returns the stats for the parent's FITNESS_CACHE, the time it took and
+    the EVAL_COUNTERS it added, so the parent can keep the totals.
+    """
+    global _race_threshold
+    vec, _race_threshold = task
+    before = EVAL_COUNTERS.copy()
+    t0 = time.perf_counter()
+    stats = score_params(vec_to_params(vec), _worker_config)
+    return stats, time.perf_counter() - t0, EVAL_COUNTERS - before
+
+
+class PoolEvaluator:
+    """Map-like `workers` argument for differential_evolution.
+
+    The EvalConfig is shipped to each worker once, when the pool starts;
+    per call only the candidate vectors travel, and only those missing
+    from FITNESS_CACHE.  Each call scores a whole DE population (one
+    generation) and reports the speedup over running the same evaluations
+    back to back.
+    """
+
+    def __init__(self, workers: int, config: EvalConfig):
+        self.workers = workers
+        self.config = config
+        self.generation = 0
+        self.pool = multiprocessing.Pool(workers, initializer=_init_worker,
+                                         initargs=(config,))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.pool.terminate()
+        self.pool.join()
+
+    def __call__(self, func, iterable):
+        # `func` is scipy's wrapper around objective(vec, config); the
+        # workers already hold that config, so only the vectors (and the
+        # current race threshold) are sent.
+        vecs = list(iterable)
+        params = [vec_to_params(vec) for vec in vecs]
+        todo = {}   # cache key -> vector, one per distinct missing Params
+        for vec, p in zip(vecs, params):
+            if FITNESS_CACHE.get(p, self.config) is None:
+                todo.setdefault(FITNESS_CACHE.key(p, self.config), vec)
+
+        chunksize = max(1, len(todo) // (self.workers * 4))
+        t0 = time.perf_counter()
+        results = self.pool.map(_pool_score, [(vec, _race_threshold) for vec in todo.values()],
+                                chunksize)
+        wall = time.perf_counter() - t0
+        for key, (stats, _, counters) in zip(todo, results):
+            FITNESS_CACHE.entries[key] = stats
+            EVAL_COUNTERS.update(counters)
+        if len(vecs) > 1:   # skip the single-vector calls made while polishing
+            busy = sum(elapsed for _, elapsed, _ in results)
+            label = "init" if self.generation == 0 else f"gen {self.generation}"
+            print(f"  [pool] {label}: {len(todo)} of {len(vecs)} candidates simulated in "
+                  f"{wall:.2f}s on {self.workers} workers (serial {busy:.2f}s, "
+                  f"speedup {busy / max(wall, 1e-9):.1f}x)")
+            self.generation += 1
+        return [FITNESS_CACHE.entries[FITNESS_CACHE.key(p, self.config)]['fitness']
+                for p in params]
+
+
+# ── Checkpoints ──
+
+CHECKPOINT_VERSION = 1
+
+def save_checkpoint(path: Path, generation: int, intermediate_result, rng: np.random.Generator,
+                    config: EvalConfig, max_iter: int, pop_size: int):
+    """Write the DE state after `generation` so a killed run can --resume."""
+    state = {
+        'version': CHECKPOINT_VERSION,
+        'generation': generation,
+        'max_iter': max_iter,
+        'pop_size': pop_size,
+        'config': dataclasses.asdict(config),
+        'population': intermediate_result.population,
+        'population_energies': intermediate_result.population_energies,
+        'rng_state': rng.bit_generator.state,
+        'race_threshold': _race_threshold,
+        'counters': dict(EVAL_COUNTERS),
+        'cache': FITNESS_CACHE.entries,
+    }
+    tmp = path.with_name(path.name + '.tmp')
+    with open(tmp, 'wb') as f:
+        pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)   # never leave a half-written checkpoint behind
+
+def load_checkpoint(path: Path, config: EvalConfig) -> dict:
+    """Read a checkpoint and restore the cache, counters and race threshold."""
+    global _race_threshold
+    if not path.exists():
+        print(f"ERROR: no checkpoint at {path} to resume from.")
+        sys.exit(1)
+    with open(path, 'rb') as f:
+        state = pickle.load(f)
+    if state.get('version') != CHECKPOINT_VERSION:
+        print(f"ERROR: {path.name} was written by an incompatible optimize.py.")
+        sys.exit(1)
+    saved = state['config']
+    if (saved['n_runs'], saved['years'], saved['seed']) != (config.n_runs, config.years, config.seed):
+        print(f"ERROR: {path.name} was scored with n_runs={saved['n_runs']}, "
+              f"years={saved['years']}, seed={saved['seed']}; pass the same settings to resume.")
+        sys.exit(1)
+    FITNESS_CACHE.entries.update(state['cache'])
+    EVAL_COUNTERS.update(state['counters'])
+    _race_threshold = state['race_threshold']
+    return state
+
+
+def run_optimization(max_iter: int = 40, pop_size: int = 20,
+                     config: EvalConfig = EvalConfig(), workers: int = 1,
+                     checkpoint: Optional[Path] = None, checkpoint_every: int = 1,
+                     resume: bool = False):
     if not HAS_SCIPY:
         print("ERROR: scipy is required.  pip install scipy")
         sys.exit(1)
 
+    rng = np.random.default_rng(123)
+    init, start_gen = 'latinhypercube', 0
+    if resume:
+        state = load_checkpoint(checkpoint, config)
+        rng.bit_generator.state = state['rng_state']
+        init, start_gen = state['population'], state['generation']
+        print(f"Resuming from {checkpoint.name} after generation {start_gen} "
+              f"(best fitness {np.min(state['population_energies']):.3f}, "
+              f"{len(FITNESS_CACHE.entries):,} cached evaluations)")
+
     bounds = [(lo, hi) for _, lo, hi, _ in SEARCH_SPACE]
     print(f"Starting Differential Evolution ({len(SEARCH_SPACE)} params, "
-          f"popsize={pop_size}, maxiter={max_iter})")
+          f"popsize={pop_size}, maxiter={max_iter}, engine={config.engine}, "
+          f"workers={workers})")
     print(f"Each iteration evaluates {pop_size * len(SEARCH_SPACE)} candidates × "
-          f"50 runs × 7 personalities = "
-          f"{pop_size * len(SEARCH_SPACE) * 50 * 7:,} simulations")
+          f"{config.n_runs} runs × 7 personalities = "
+          f"{pop_size * len(SEARCH_SPACE) * config.n_runs * 7:,} simulations")
     print()
 
-    result = differential_evolution(
-        objective,
-        bounds,
-        maxiter=max_iter,
-        popsize=pop_size,
-        seed=123,
-        tol=0.001,
-        mutation=(0.5, 1.5),
-        recombination=0.8,
-        callback=callback_progress,
-        disp=True,
-    )
+    def progress(intermediate_result):
+        generation = start_gen + intermediate_result.nit
+        callback_progress(intermediate_result, config)
+        if checkpoint and checkpoint_every and generation % checkpoint_every == 0:
+            save_checkpoint(checkpoint, generation, intermediate_result, rng,
+                            config, max_iter, pop_size)
+
+    with contextlib.ExitStack() as stack:
+        pool = stack.enter_context(PoolEvaluator(workers, config)) if workers > 1 else 1
+        result = differential_evolution(
+            objective,
+            bounds,
+            args=(config,),
+            maxiter=max(0, max_iter - start_gen),
+            popsize=pop_size,
+            seed=rng,
+            init=init,
+            tol=0.001,
+            mutation=(0.5, 1.5),
+            recombination=0.8,
+            callback=progress,
+            disp=True,
+            workers=pool,
+            updating='deferred' if workers > 1 else 'immediate',
+        )
 
     best_params = vec_to_params(result.x)
     print("\n\nOptimization complete!")
     print(f"Best fitness: {result.fun:.4f}")
+    if config.race:
+        print(f"Racing: {race_summary()}")
+    final_report(best_params, config)
+    return best_params
+
+def final_report(best_params: Params, config: EvalConfig):
+    """Re-evaluate the winner with more runs (and fresh tapes) for the report."""
+    report = dataclasses.replace(config, n_runs=200, seed=99)
+    print_stats(FITNESS_CACHE.score(best_params, report, full=True), best_params)
+    print(f"Fitness cache: {FITNESS_CACHE.summary()}")
+
+
+# ═══════════════════════════════════════════════════════════════
+#  Surrogate-assisted search
+# ═══════════════════════════════════════════════════════════════
+# A Gaussian process fitted to every simulated candidate predicts the
+# fitness of thousands of untried vectors; only the few with the highest
+# expected improvement are simulated for real each round.
+
+class GaussianProcess:
+    """Small GP regressor: ARD squared-exponential kernel plus noise.
+
+    Inputs are expected in [0, 1]^D; hyperparameters are fitted by
+    maximising the log marginal likelihood with L-BFGS-B.
+    """
 
-    # Re-evaluate with more runs for final report
-    evaluate_params(best_params, n_runs=200, years=20, seed=99, verbose=True)
+    def __init__(self):
+        self.theta = None   # log length scales (D), log signal var, log noise var
+
+    def _kernel(self, A, B, theta):
+        ls, signal = np.exp(theta[:-2]), np.exp(theta[-2])
+        d = (A[:, None, :] - B[None, :, :]) / ls
+        return signal * np.exp(-0.5 * np.sum(d * d, axis=-1))
+
+    def _neg_log_likelihood(self, theta, X, y):
+        K = self._kernel(X, X, theta) + (np.exp(theta[-1]) + 1e-8) * np.eye(len(X))
+        try:
+            L = np.linalg.cholesky(K)
+        except np.linalg.LinAlgError:
+            return 1e25
+        alpha = cho_solve((L, True), y)
+        return 0.5 * y @ alpha + np.sum(np.log(np.diag(L)))
+
+    def fit(self, X: np.ndarray, y: np.ndarray):
+        self.X = X
+        self.y_mean, self.y_std = y.mean(), y.std() or 1.0
+        yn = (y - self.y_mean) / self.y_std
+        dim = X.shape[1]
+        theta0 = self.theta if self.theta is not None else np.r_[np.full(dim, np.log(0.5)), 0.0, np.log(0.1)]
+        bounds = [(np.log(0.02), np.log(20.0))] * dim + [(np.log(0.05), np.log(20.0)),
+                                                         (np.log(1e-6), np.log(1.0))]
+        res = minimize(self._neg_log_likelihood, theta0, args=(X, yn),
+                       method='L-BFGS-B', bounds=bounds, options={'maxiter': 100})
+        self.theta = res.x
+        K = self._kernel(X, X, self.theta) + (np.exp(self.theta[-1]) + 1e-8) * np.eye(len(X))
+        self.L = np.linalg.cholesky(K)
+        self.alpha = cho_solve((self.L, True), yn)
+        return self
+
+    def predict(self, Xs: np.ndarray):
+        """Posterior mean and standard deviation at Xs (original y units)."""
+        Ks = self._kernel(Xs, self.X, self.theta)
+        mean = Ks @ self.alpha
+        v = solve_triangular(self.L, Ks.T, lower=True)
+        var = np.maximum(np.exp(self.theta[-2]) - np.sum(v * v, axis=0), 1e-12)
+        return mean * self.y_std + self.y_mean, np.sqrt(var) * self.y_std
+
+
+def _expected_improvement(mean, std, best, xi=0.01):
+    """EI for minimisation."""
+    gap = best - mean - xi
+    z = gap / std
+    return gap * ndtr(z) + std * np.exp(-0.5 * z * z) / math.sqrt(2 * math.pi)
+
+def run_surrogate(budget: int = 200, batch: int = 8, config: EvalConfig = EvalConfig(),
+                  workers: int = 1, n_candidates: int = 4000, seed: int = 123):
+    """Minimise the objective with a GP surrogate on `budget` real evaluations.
+
+    Starts from a Latin hypercube of 4 × len(SEARCH_SPACE) vectors (or half
+    the budget, if smaller, but leaving room for at least one GP step), then
+    repeatedly fits the GP to log(1 + fitness) and simulates the `batch`
+    vectors with the highest expected improvement among random and
+    near-best candidates.  A budget below 3 is all initial design.
+    """
+    if not HAS_SCIPY:
+        print("ERROR: scipy is required.  pip install scipy")
+        sys.exit(1)
+
+    config = dataclasses.replace(config, race=False)   # racing needs DE's population
+    rng = np.random.default_rng(seed)
+    lo = np.array([b[1] for b in SEARCH_SPACE], dtype=float)
+    hi = np.array([b[2] for b in SEARCH_SPACE], dtype=float)
+    dim = len(SEARCH_SPACE)
+    # The GP needs two points to fit; the budget is never exceeded.
+    n_init = min(max(min(4 * dim, max(batch, budget // 2), budget - 1), 2), budget)
+    print(f"Starting surrogate search ({dim} params, budget={budget} evaluations, "
+          f"{n_init} initial, batch={batch}, engine={config.engine}, workers={workers})")
+    print(f"Each evaluation = {config.n_runs} runs × 7 personalities; DE with "
+          f"popsize 20 simulates {20 * dim} candidates per generation")
+    if n_init >= budget:
+        print(f"Budget {budget} is used up by the initial design: no GP steps will run")
+    print()
+
+    with contextlib.ExitStack() as stack:
+        pool = stack.enter_context(PoolEvaluator(workers, config)) if workers > 1 else None
+
+        def evaluate(units):
+            vecs = list(lo + units * (hi - lo))
+            if pool:
+                return np.array(pool(objective, vecs))
+            return np.array([objective(vec, config) for vec in vecs])
+
+        X = LatinHypercube(d=dim, seed=rng).random(n_init)
+        y = evaluate(X)
+        gp = GaussianProcess()
+        while len(X) < budget:
+            gp.fit(X, np.log1p(y))
+            elite = X[np.argsort(y)[:5]]
+            near = elite[rng.integers(0, len(elite), n_candidates // 2)]
+            near = np.clip(near + rng.normal(0, 0.05, near.shape), 0, 1)
+            cand = np.vstack([rng.random((n_candidates - len(near), dim)), near])
+            mean, std = gp.predict(cand)
+            ei = _expected_improvement(mean, std, np.log1p(y.min()))
+            picks = cand[np.argsort(-ei)[:min(batch, budget - len(X))]]
+            X = np.vstack([X, picks])
+            y = np.concatenate([y, evaluate(picks)])
+            print(f"  [GP] evaluations={len(X)}  best={y.min():.3f}  "
+                  f"batch best={y[-len(picks):].min():.3f}  max EI={ei.max():.4f}")
+
+    best_params = vec_to_params(lo + X[np.argmin(y)] * (hi - lo))
+    print("\n\nSurrogate search complete!")
+    print(f"Best fitness: {y.min():.4f} after {len(X)} evaluations "
+          f"({len(X) * config.n_runs * 7:,} simulations)")
+    final_report(best_params, config)
     return best_params
 
 
+# ═══════════════════════════════════════════════════════════════
+#  Multi-objective search (NSGA-II)
+# ═══════════════════════════════════════════════════════════════
+# Instead of one weighted sum, every PENALTIES term is its own objective.
+# The objectives are the unclipped margins, so candidates that already
+# meet a criterion still trade off how much slack they leave on it.  All
+# non-dominated candidates ever simulated are kept in a Pareto archive on
+# disk; --pick then chooses a trade-off from it by re-weighting the stored
+# terms, without running a single game.
+
+ARCHIVE_VERSION = 1
+ARCHIVE_MAX = 500       # archive is thinned by crowding distance beyond this
+
+def _dominates(F: np.ndarray) -> np.ndarray:
+    """D[i, j] is True when objective row i Pareto-dominates row j."""
+    le = np.all(F[:, None, :] <= F[None, :, :], axis=-1)
+    lt = np.any(F[:, None, :] < F[None, :, :], axis=-1)
+    return le & lt
+
+def non_dominated_fronts(F: np.ndarray) -> list:
+    """Index arrays of the successive non-dominated fronts of F (N, K)."""
+    dom = _dominates(F)
+    count = dom.sum(axis=0)            # how many rows dominate each row
+    fronts = []
+    front = np.flatnonzero(count == 0)
+    while front.size:
+        fronts.append(front)
+        count = count - dom[front].sum(axis=0)
+        count[front] = -1
+        front = np.flatnonzero(count == 0)
+    return fronts
+
+def crowding_distance(F: np.ndarray) -> np.ndarray:
+    """NSGA-II crowding distance of each row within one front."""
+    n = len(F)
+    dist = np.zeros(n)
+    if n <= 2:
+        return np.full(n, np.inf)
+    for k in range(F.shape[1]):
+        order = np.argsort(F[:, k], kind='stable')
+        span = F[order[-1], k] - F[order[0], k]
+        dist[order[0]] = dist[order[-1]] = np.inf
+        if span > 0:
+            dist[order[1:-1]] += (F[order[2:], k] - F[order[:-2], k]) / span
+    return dist
+
+def _nsga_select(F: np.ndarray, n: int) -> np.ndarray:
+    """Indices of the n best rows by (front, crowding distance)."""
+    chosen = []
+    for front in non_dominated_fronts(F):
+        if len(chosen) + len(front) <= n:
+            chosen.extend(front)
+            continue
+        crowd = crowding_distance(F[front])
+        chosen.extend(front[np.argsort(-crowd, kind='stable')[:n - len(chosen)]])
+        break
+    return np.array(chosen)
+
+def _nsga_offspring(X: np.ndarray, rank: np.ndarray, crowd: np.ndarray,
+                    rng: np.random.Generator, eta_c: float = 15.0, eta_m: float = 20.0) -> np.ndarray:
+    """Binary tournaments, SBX crossover and polynomial mutation in [0, 1]^D."""
+    n, dim = X.shape
+    a, b = rng.integers(0, n, (2, n))
+    better = (rank[a] < rank[b]) | ((rank[a] == rank[b]) & (crowd[a] > crowd[b]))
+    parents = X[np.where(better, a, b)]
+
+    children = parents.copy()
+    for i in range(0, n - 1, 2):
+        if rng.random() > 0.9:
+            continue
+        u = rng.random(dim)
+        beta = np.where(u <= 0.5, (2 * u) ** (1 / (eta_c + 1)),
+                        (1 / (2 * (1 - u))) ** (1 / (eta_c + 1)))
+        swap = rng.random(dim) < 0.5
+        p1, p2 = parents[i], parents[i + 1]
+        c1 = 0.5 * ((1 + beta) * p1 + (1 - beta) * p2)
+        c2 = 0.5 * ((1 - beta) * p1 + (1 + beta) * p2)
+        children[i], children[i + 1] = np.where(swap, c2, c1), np.where(swap, c1, c2)
+
+    mutate = rng.random((n, dim)) < 1.0 / dim
+    u = rng.random((n, dim))
+    delta = np.where(u < 0.5, (2 * u) ** (1 / (eta_m + 1)) - 1,
+                     1 - (2 * (1 - u)) ** (1 / (eta_m + 1)))
+    return np.clip(np.where(mutate, children + delta, children), 0.0, 1.0)
+
+
+def _archive_config(config: EvalConfig) -> dict:
+    return {'n_runs': config.n_runs, 'years': config.years, 'seed': config.seed}
+
+def load_archive(path: Path, config: Optional[EvalConfig] = None) -> list:
+    """Archive entries ({'params', 'stats'}) from `path`, [] if it is missing.
+
+    With a config, an archive scored under a different n_runs/years/seed is
+    an error: its penalties are not comparable with new ones.
+    """
+    if not path.exists():
+        return []
+    data = json.loads(path.read_text())
+    if data.get('version') != ARCHIVE_VERSION:
+        print(f"ERROR: {path} is not a version {ARCHIVE_VERSION} Pareto archive")
+        sys.exit(1)
+    if config is not None and data['config'] != _archive_config(config):
+        print(f"ERROR: {path} was scored with {data['config']}, not {_archive_config(config)}; "
+              f"use another --archive or matching --opt-runs")
+        sys.exit(1)
+    return data['entries']
+
+def save_archive(path: Path, entries: list, config: EvalConfig):
+    data = {'version': ARCHIVE_VERSION, 'config': _archive_config(config),
+            'objectives': PENALTIES, 'entries': entries}
+    tmp = path.with_name(path.name + '.tmp')
+    tmp.write_text(json.dumps(data, indent=1))
+    os.replace(tmp, path)
+
+def _term_matrix(entries: list, terms: str = 'margins') -> np.ndarray:
+    return np.array([[e['stats'][terms][k] for k in PENALTIES] for e in entries])
+
+def update_archive(entries: list, new: list) -> list:
+    """Non-dominated, de-duplicated union of two archive entry lists."""
+    merged = {}
+    for e in entries + new:
+        merged.setdefault(json.dumps(e['params'], sort_keys=True), e)
+    merged = list(merged.values())
+    F = _term_matrix(merged)
+    front = non_dominated_fronts(F)[0]
+    if len(front) > ARCHIVE_MAX:
+        crowd = crowding_distance(F[front])
+        front = front[np.argsort(-crowd, kind='stable')[:ARCHIVE_MAX]]
+    return [merged[i] for i in sorted(front)]
+
+def run_pareto(generations: int = 40, pop_size: int = 64, config: EvalConfig = EvalConfig(),
+               workers: int = 1, archive: Path = Path('pareto_archive.json'), seed: int = 123):
+    """NSGA-II over the PENALTIES objectives; returns the equal-weight pick.
+
+    Every simulated candidate is offered to the archive at `archive`
+    (merged with what is already there), rewritten after each generation.
+    """
+    config = dataclasses.replace(config, race=False)   # racing needs a scalar
+    rng = np.random.default_rng(seed)
+    lo = np.array([b[1] for b in SEARCH_SPACE], dtype=float)
+    hi = np.array([b[2] for b in SEARCH_SPACE], dtype=float)
+    dim = len(SEARCH_SPACE)
+    pop_size += pop_size % 2
+    entries = load_archive(archive, config)
+    print(f"Starting NSGA-II ({dim} params, {len(PENALTIES)} objectives, population {pop_size}, "
+          f"{generations} generations, engine={config.engine}, workers={workers})")
+    print(f"Archive: {archive} ({len(entries)} entries)")
+    print()
+
+    with contextlib.ExitStack() as stack:
+        pool = stack.enter_context(PoolEvaluator(workers, config)) if workers > 1 else None
+
+        def evaluate(units):
+            vecs = list(lo + units * (hi - lo))
+            if pool:
+                pool(objective, vecs)
+            return [FITNESS_CACHE.score(vec_to_params(vec), config, full=True) for vec in vecs]
+
+        def offer(units, stats):
+            nonlocal entries
+            new = [{'params': {name: getattr(vec_to_params(lo + x * (hi - lo)), name)
+                               for name, *_ in SEARCH_SPACE},
+                    'stats': st} for x, st in zip(units, stats)]
+            entries = update_archive(entries, new)
+            save_archive(archive, entries, config)
+
+        X = LatinHypercube(d=dim, seed=rng).random(pop_size)
+        stats = evaluate(X)
+        F = np.array([[st['margins'][k] for k in PENALTIES] for st in stats])
+        offer(X, stats)
+        for gen in range(1, generations + 1):
+            rank = np.empty(len(X), dtype=int)
+            for r, front in enumerate(non_dominated_fronts(F)):
+                rank[front] = r
+            crowd = np.empty(len(X))
+            for r in np.unique(rank):
+                crowd[rank == r] = crowding_distance(F[rank == r])
+            kids = _nsga_offspring(X, rank, crowd, rng)
+            kid_stats = evaluate(kids)
+            offer(kids, kid_stats)
+            X, F = np.vstack([X, kids]), np.vstack([F, [[st['margins'][k] for k in PENALTIES]
+                                                        for st in kid_stats]])
+            keep = _nsga_select(F, pop_size)
+            X, F = X[keep], F[keep]
+            fit = np.maximum(0.0, F).sum(axis=1)
+            print(f"  [NSGA] gen {gen}: front={len(non_dominated_fronts(F)[0])}  "
+                  f"best fitness={fit.min():.3f}  archive={len(entries)}  "
+                  f"zero-penalty={int(np.sum(fit == 0))}")
+
+    print("\n\nNSGA-II complete!")
+    print(f"Archive holds {len(entries)} non-dominated trade-offs; choose one with "
+          f"--pick (e.g. --pick p10=3,spread=0.5)")
+    best = pick_from_archive(entries, {})
+    return Params(**best['params'])
+
+def parse_weights(text: str) -> dict:
+    """'p10=3,spread=0.5' -> {'p10': 3.0, 'spread': 0.5}; unnamed weights are 1.
+    Raises ValueError naming the bad item."""
+    weights = {}
+    for item in filter(None, (text or '').split(',')):
+        name, eq, value = (part.strip() for part in item.partition('='))
+        if name not in PENALTIES:
+            raise ValueError(f"unknown penalty {name!r} (expected one of {', '.join(PENALTIES)})")
+        try:
+            weight = float(value) if eq else math.nan
+        except ValueError:
+            weight = math.nan
+        if not (math.isfinite(weight) and weight >= 0):
+            raise ValueError(f"{item.strip()!r} is not {name}=WEIGHT with a number WEIGHT >= 0")
+        weights[name] = weight
+    return weights
+
+def pick_from_archive(entries: list, weights: dict) -> dict:
+    """The archive entry minimising the re-weighted penalty sum (ties, such
+    as several zero-penalty entries, go to the most weighted slack); prints
+    its report."""
+    if not entries:
+        print("ERROR: the Pareto archive is empty — run --pareto first")
+        sys.exit(1)
+    w = np.array([weights.get(k, 1.0) for k in PENALTIES])
+    score = _term_matrix(entries, 'penalties') @ w
+    slack = _term_matrix(entries, 'margins') @ w
+    best = entries[int(np.lexsort((slack, score))[0])]
+    print(f"\nPicked 1 of {len(entries)} archive entries, weights "
+          + ' '.join(f"{k}={v:g}" for k, v in zip(PENALTIES, w))
+          + f" (weighted penalty {score.min():.3f})")
+    print_stats(best['stats'], Params(**best['params']))
+    return best
+
+
+# ═══════════════════════════════════════════════════════════════
+#  Seed distributions and sensitivity sweeps
+# ═══════════════════════════════════════════════════════════════
+# Every grid point is one evaluate_params call on a (parameter, value,
+# seed) triple, with all other parameters at their Params() defaults.
+# Points are independent, so they are fanned out over a process pool and
+# each result row is written out the moment it arrives.
+
+EVAL_SEED = 99          # the seed --eval has always used
+SWEEP_FIELDS = ('param', 'value', 'seed', 'fitness', 'global_median_ratio',
+                'global_p10_ratio', 'worst_personality_ratio', 'spread',
+                'max_impeach_rate', 'avg_starve_frac', 'seconds')
+
+def sweep_tasks(names: list, points: int, seeds: list) -> list:
+    """(param, value, seed) grid: a baseline point (param None) per seed,
+    then `points` evenly spaced values across each parameter's SEARCH_SPACE
+    range.  Integer parameters drop duplicate rounded values."""
+    bounds = {name: (lo, hi, is_int) for name, lo, hi, is_int in SEARCH_SPACE}
+    grid = [(None, None)]
+    for name in names:
+        lo, hi, is_int = bounds[name]
+        values = np.linspace(lo, hi, points).tolist()
+        if is_int:
+            values = sorted({int(round(v)) for v in values})
+        grid += [(name, v) for v in values]
+    # Seed-major, so consecutive tasks on a worker reuse its cached tapes
+    return [(name, value, seed) for seed in seeds for name, value in grid]
+
+def _sweep_point(task) -> dict:
+    """Evaluate one grid point; runs in a pool worker."""
+    name, value, seed, n_runs, engine = task
+    vec = params_to_vec(Params())
+    if name is not None:
+        vec[[n for n, *_ in SEARCH_SPACE].index(name)] = value
+    t0 = time.perf_counter()
+    stats = evaluate_params(vec_to_params(vec), n_runs=n_runs, years=20, seed=seed,
+                            engine=engine)
+    row = {'param': name or 'baseline', 'value': value, 'seed': seed}
+    row.update({k: stats[k] for k in SWEEP_FIELDS[3:-1]})
+    row['seconds'] = time.perf_counter() - t0
+    return row
+
+def run_grid(tasks: list, n_runs: int = 200, engine: str = 'batch', workers: int = 1,
+             out: Optional[Path] = None) -> list:
+    """Evaluate every (param, value, seed) task, in completion order.
+
+    Rows are streamed to `out` as they finish: CSV for a .csv suffix, JSON
+    lines otherwise.  Returns all rows.
+    """
+    jobs = [task + (n_runs, engine) for task in tasks]
+    rows = []
+    t0 = time.perf_counter()
+    with contextlib.ExitStack() as stack:
+        write = None
+        if out is not None:
+            f = stack.enter_context(open(out, 'w', newline=''))
+            if out.suffix == '.csv':
+                writer = csv.DictWriter(f, SWEEP_FIELDS)
+                writer.writeheader()
+                write = writer.writerow
+            else:
+                write = lambda row: f.write(json.dumps(row) + '\n')
+        if workers > 1:
+            pool = stack.enter_context(multiprocessing.Pool(workers))
+            results = pool.imap_unordered(_sweep_point, jobs)
+        else:
+            results = map(_sweep_point, jobs)
+        for row in results:
+            rows.append(row)
+            if write:
+                write(row)
+                f.flush()
+            if len(rows) % max(1, len(jobs) // 10) == 0 or len(rows) == len(jobs):
+                print(f"  [grid] {len(rows)}/{len(jobs)} points "
+                      f"({time.perf_counter() - t0:.1f}s)", flush=True)
+    return rows
+
+def print_seed_distribution(rows: list):
+    """Fitness spread of the baseline Params() across seeds."""
+    fit = np.array([r['fitness'] for r in rows if r['param'] == 'baseline'])
+    med = np.array([r['global_median_ratio'] for r in rows if r['param'] == 'baseline'])
+    print(f"\n  Baseline over {len(fit)} seeds")
+    print(f"  {'':<22} {'mean':>8} {'std':>8} {'min':>8} {'p10':>8} {'median':>8} {'p90':>8} {'max':>8}")
+    for label, x in (('Fitness', fit), ('Median survival ratio', med)):
+        print(f"  {label:<22} {x.mean():>8.3f} {x.std():>8.3f} {x.min():>8.3f} "
+              f"{np.percentile(x, 10):>8.3f} {np.median(x):>8.3f} "
+              f"{np.percentile(x, 90):>8.3f} {x.max():>8.3f}")
+
+def print_sweep(rows: list):
+    """Mean fitness per swept value, parameters ordered by sensitivity
+    (range of the mean fitness over their values)."""
+    by_point = collections.defaultdict(list)
+    for r in rows:
+        by_point[r['param'], r['value']].append(r['fitness'])
+    base = np.mean(by_point.pop(('baseline', None)))
+    table = collections.defaultdict(list)
+    for (name, value), fits in by_point.items():
+        table[name].append((value, np.mean(fits), np.std(fits)))
+    swing = {name: max(m for _, m, _ in vals) - min(m for _, m, _ in vals)
+             for name, vals in table.items()}
+
+    print(f"\n  Sensitivity (baseline fitness {base:.3f}; mean ± std over seeds)")
+    for name in sorted(table, key=swing.get, reverse=True):
+        cells = '  '.join(f"{value:g}: {m:.2f}±{sd:.2f}" for value, m, sd in sorted(table[name]))
+        print(f"  {name:<18} swing {swing[name]:>7.2f}   {cells}")
+
+
+# ═══════════════════════════════════════════════════════════════
+#  Parity with game.js
+# ═══════════════════════════════════════════════════════════════
+# parity.js runs the real makeDecisions / simulateYear from game.js under
+# node, answering each Math.random call from the same tape slot that
+# simulate_game reads for that decision.  Any difference in the per-year
+# state then means the two rule sets have drifted apart.
+
+PARITY_JS = Path(__file__).parent / 'parity.js'
+TAPE_SLOTS = {name: value for name, value in globals().items()
+              if name.startswith('U_') and isinstance(value, int)}
+PARITY_FIELDS = ('weather', 'pop', 'grain', 'acres', 'loyalty', 'land_price', 'buildings',
+                 'impeached')
+
+# game.js lines that draw Math.random (directly or through pick / randInt /
+# jitter) -> the tape slot simulate_game uses for the same decision.  The
+# first matching regex wins; a True flag gives the n-th draw on the line
+# slot + n (the build loop).
+PARITY_CALL_SITES = [
+    (r"Math\.random\(\) > 0\.6 && ac > pop", 'U_SELL', False),
+    (r"sold = Math\.floor\(\(ac - pop \* 5\)", 'U_SELL_FRAC', False),
+    (r"var feed = .*jitter\(\)", 'U_FEED_JITTER', False),
+    (r"Math\.random\(\) < p\.landBias", 'U_BUY', False),
+    (r"bought = Math\.max\(0, Math\.floor\(\(gr / lp\)", 'U_BUY_FRAC', False),
+    (r"var planted = .*jitter\(\)", 'U_PLANT_JITTER', False),
+    (r"gr >= cost && Math\.random\(\) < 0\.45", 'U_BUILD_0', True),
+    (r"var hy = randInt\(", 'U_HARVEST', False),
+    (r"var rf = randInt\(", 'U_RATS', False),
+    (r"var baseImm = Math\.floor\(st\.population \*", 'U_IMM', False),
+    (r"Math\.random\(\) < [\d.]+ \* \(age\.plagueMult", 'U_PLAGUE', False),
+    (r"Math\.random\(\) >= templeBlock", 'U_TEMPLE', False),
+    (r"st\.landPrice = ", 'U_LAND_PRICE', False),
+    (r"var rotRate = ", 'U_ROT', False),
+    (r"Math\.random\(\) < [\d.]+ \* \(age\.attackMult", 'U_ATTACK', False),
+    (r"var tStr = randInt\(", 'U_THREAT', False),
+    (r"var tPop = ", 'U_TRIBUTE_POP', False),
+    (r"var tGr = ", 'U_TRIBUTE_GRAIN', False),
+    (r"var tAc = ", 'U_TRIBUTE_ACRES', False),
+    (r"st\.weather === 'flood' && Math\.random\(\)", 'U_FLOOD', False),
+    (r"floodAcres = Math\.min\(randInt\(", 'U_FLOOD_ACRES', False),
+    (r"st\.loyalty < \d+ && Math\.random\(\)", 'U_REVOLT', False),
+    (r"Math\.random\(\) < [\d.]+ \* \(age\.eventMult", 'U_EVENT', False),
+    (r"var ev = randInt\(", 'U_EVENT_KIND', False),
+    (r"var (bLoss|cGr|fA|fP|lLoss|treas|mPop|dk) = ", 'U_EVENT_SIZE', False),
+    (r"var qA = ", 'U_EVENT_ACRES', False),
+]
+
+def run_parity(n_runs: int = 10, years: int = 20, seed: int = 7) -> bool:
+    """Play n_runs games per personality through game.js and simulate_game
+    on shared tapes and report where the per-year states first differ.
+
+    Returns True when every game matches year for year.  World ages are
+    not part of the port, so game.js runs with its neutral age.
+    """
+    node = shutil.which('node')
+    if node is None:
+        print("ERROR: node is required to run game.js (https://nodejs.org)")
+        sys.exit(1)
+
+    params = Params()
+    personalities = make_personalities(params)
+    tapes = make_tapes(len(personalities), n_runs, years, seed)
+    games = [(pers, tape) for pers, runs in zip(personalities, tapes) for tape in runs]
+    job = {
+        'tapes': [tape.tolist() for _, tape in games],
+        'personalities': [pers.name for pers, _ in games],
+        'slots': TAPE_SLOTS,
+        'callSites': PARITY_CALL_SITES,
+    }
+    proc = subprocess.run([node, str(PARITY_JS)], input=json.dumps(job),
+                          capture_output=True, text=True)
+    if proc.returncode != 0:
+        print(f"ERROR: {PARITY_JS.name} failed:\n{proc.stderr}")
+        sys.exit(1)
+    js_games = json.loads(proc.stdout)['games']
+
+    first_diff = collections.Counter()   # field -> games diverging there first
+    diff_years = []
+    example = None
+    unmapped = collections.Counter()
+    read = set()
+    for (pers, tape), js in zip(games, js_games):
+        py = []
+        simulate_game(params, pers, years=years, tape=tape, keep_history=False, trace=py)
+        unmapped.update({int(line): n for line, n in js['unmapped'].items()})
+        read.update(js['read'])
+        for py_year, js_year in itertools.zip_longest(py, js['years'], fillvalue={}):
+            fields = [f for f in PARITY_FIELDS if py_year.get(f) != js_year.get(f)]
+            if fields:
+                first_diff[fields[0]] += 1
+                diff_years.append(py_year.get('year', js_year.get('year')))
+                if example is None:
+                    example = (pers.name, py_year, js_year)
+                break
+
+    n_games = len(games)
+    print(f"Parity: game.js vs simulate_game, {n_games} games × {years} years "
+          f"(tape seed {seed})")
+    print(f"  Identical games:   {n_games - sum(first_diff.values())}/{n_games}")
+    if first_diff:
+        print("  First divergence:  " + ', '.join(f"{f} {n}" for f, n in first_diff.most_common())
+              + f"  (median year {int(np.median(diff_years))})")
+        name, py_year, js_year = example
+        print(f"  Example ({name}, year {py_year.get('year', js_year.get('year'))}):")
+        for f in PARITY_FIELDS:
+            mark = '  ' if py_year.get(f) == js_year.get(f) else '≠ '
+            print(f"    {mark}{f:<11} python {py_year.get(f)!s:<24} game.js {js_year.get(f)}")
+    if unmapped:
+        js_lines = (PARITY_JS.parent / 'game.js').read_text().splitlines()
+        print("  game.js draws with no tape slot (not in the port, or narrative only):")
+        for line, n in sorted(unmapped.items()):
+            print(f"    game.js:{line:<5} ×{n:<6} {js_lines[line - 1].strip()[:70]}")
+    unread = sorted(set(TAPE_SLOTS) - {name for name, i in TAPE_SLOTS.items() if i in read})
+    if unread:
+        print(f"  Tape slots game.js never drew: {', '.join(unread)}")
+    return not first_diff
+
+
+# ═══════════════════════════════════════════════════════════════
+#  Benchmarks
+# ═══════════════════════════════════════════════════════════════
+
+BENCH_SIZES = (20, 100)      # runs per personality
+BENCH_SEEDS = (1, 2, 3)
+BENCH_YEARS = 20
+
+def _bench_case(engine: str, n_runs: int, seeds=BENCH_SEEDS, years: int = BENCH_YEARS) -> dict:
+    """Time the simulator and the fitness function for one engine and size.
+
+    Speeds come from untraced runs over every seed; peak memory from a
+    separate tracemalloc pass over the first seed.
+    """
+    params = Params()
+    personalities = make_personalities(params)
+    games = year_count = 0
+    sim_time = eval_time = 0.0
+    for seed in seeds:
+        tapes = make_tapes(len(personalities), n_runs, years, seed)
+        t0 = time.perf_counter()
+        runs = run_games(params, personalities, tapes, engine)
+        sim_time += time.perf_counter() - t0
+        games += runs['final_pop'].size
+        year_count += int(runs['years_played'].sum())
+
+        t0 = time.perf_counter()
+        evaluate_params(params, n_runs=n_runs, years=years, engine=engine, tapes=tapes)
+        eval_time += time.perf_counter() - t0
+
+    tapes = make_tapes(len(personalities), n_runs, years, seeds[0])
+    tracemalloc.start()
+    evaluate_params(params, n_runs=n_runs, years=years, engine=engine, tapes=tapes)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        'engine': engine,
+        'n_runs': n_runs,
+        'years': years,
+        'seeds': list(seeds),
+        'games': games,
+        'games_per_sec': games / sim_time,
+        'years_per_sec': year_count / sim_time,
+        'evals_per_sec': len(seeds) / eval_time,
+        'peak_mem_mb': peak / 2**20,
+    }
+
+def run_benchmarks(engines=ENGINES, sizes=BENCH_SIZES) -> dict:
+    """Benchmark every engine × size on fixed seeds; JSON-ready results."""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=Path(__file__).parent,
+                                capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    report = {
+        'commit': commit,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'cases': [],
+    }
+    print(f"  {'Engine':<8} {'Runs':>5} {'Games/s':>10} {'Years/s':>11} {'Evals/s':>9} {'PeakMB':>8}")
+    print(f"  {'-'*8} {'-'*5} {'-'*10} {'-'*11} {'-'*9} {'-'*8}")
+    for engine in engines:
+        for n_runs in sizes:
+            case = _bench_case(engine, n_runs)
+            report['cases'].append(case)
+            print(f"  {engine:<8} {n_runs:>5} {case['games_per_sec']:>10,.0f} "
+                  f"{case['years_per_sec']:>11,.0f} {case['evals_per_sec']:>9.2f} "
+                  f"{case['peak_mem_mb']:>8.2f}")
+    return report
+
+
 # ═══════════════════════════════════════════════════════════════
 #  Apply optimized parameters back to game.js
 # ═══════════════════════════════════════════════════════════════
@@ -671,6 +2105,18 @@ def main():
     parser = argparse.ArgumentParser(description="Hamurabi balance optimizer")
     parser.add_argument('--eval', action='store_true',
                         help='Evaluate current parameters (no optimization)')
+    parser.add_argument('--profile', action='store_true',
+                        help='With --eval, time each phase of the simulated year')
+    parser.add_argument('--seeds', type=int, default=1,
+                        help='Seeds for --eval / --sweep, counting up from 99 (default: 1)')
+    parser.add_argument('--sweep', action='store_true',
+                        help='One-at-a-time sensitivity sweep around the current parameters')
+    parser.add_argument('--sweep-params',
+                        help='Comma-separated parameters to --sweep (default: all searched)')
+    parser.add_argument('--sweep-points', type=int, default=5,
+                        help='Values per parameter across its search range (default: 5)')
+    parser.add_argument('--out', type=Path,
+                        help='Stream --sweep / multi-seed --eval rows to this .csv or .jsonl file')
     parser.add_argument('--apply', action='store_true',
                         help='Apply last optimization result to game.js')
     parser.add_argument('--maxiter', type=int, default=40,
@@ -679,15 +2125,98 @@ def main():
                         help='DE population size multiplier (default: 20)')
     parser.add_argument('--runs', type=int, default=200,
                         help='Simulations per personality for eval (default: 200)')
+    parser.add_argument('--engine', choices=ENGINES, default='batch',
+                        help='Simulation engine: NumPy batch or reference Python (default: batch)')
+    parser.add_argument('--opt-runs', type=int, default=50,
+                        help='Simulations per personality for each DE candidate (default: 50)')
+    parser.add_argument('--race', action='store_true',
+                        help='Stop scoring DE candidates early once they cannot beat the population')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Parallel processes for DE generations and --eval/--sweep grids (default: 1)')
+    parser.add_argument('--checkpoint', type=Path,
+                        default=Path(__file__).parent / 'optimize_checkpoint.pkl',
+                        help='Checkpoint file for --resume (default: optimize_checkpoint.pkl)')
+    parser.add_argument('--checkpoint-every', type=int, default=1,
+                        help='Write the checkpoint every N DE generations, 0 = never (default: 1)')
+    parser.add_argument('--resume', action='store_true',
+                        help='Continue the optimization saved in --checkpoint')
+    parser.add_argument('--surrogate', action='store_true',
+                        help='Search with a Gaussian-process surrogate instead of DE')
+    parser.add_argument('--budget', type=int, default=200,
+                        help='Real candidate evaluations for --surrogate (default: 200)')
+    parser.add_argument('--parity', action='store_true',
+                        help='Check the Python port against game.js (needs node)')
+    parser.add_argument('--parity-runs', type=int, default=10,
+                        help='Games per personality for --parity (default: 10)')
+    parser.add_argument('--pareto', action='store_true',
+                        help='Multi-objective NSGA-II over the penalty terms (--maxiter generations)')
+    parser.add_argument('--pareto-pop', type=int, default=64,
+                        help='NSGA-II population size (default: 64)')
+    parser.add_argument('--archive', type=Path,
+                        default=Path(__file__).parent / 'pareto_archive.json',
+                        help='Pareto archive for --pareto / --pick (default: pareto_archive.json)')
+    parser.add_argument('--pick', metavar='WEIGHTS',
+                        help='Pick from the archive by penalty weights, e.g. p10=3,spread=0.5')
+    parser.add_argument('--bench', action='store_true',
+                        help='Benchmark the simulator and fitness function')
+    parser.add_argument('--bench-out', type=Path,
+                        help='Also write the --bench results as JSON to this file')
     args = parser.parse_args()
+    if args.race and args.surrogate:
+        parser.error('--race only applies to DE; --surrogate scores every candidate in full')
 
     js_path = Path(__file__).parent / 'game.js'
     results_path = Path(__file__).parent / 'optimized_params.json'
 
+    seeds = list(range(EVAL_SEED, EVAL_SEED + args.seeds))
+    if args.sweep:
+        names = args.sweep_params.split(',') if args.sweep_params else [n for n, *_ in SEARCH_SPACE]
+        unknown = set(names) - {n for n, *_ in SEARCH_SPACE}
+        if unknown:
+            print(f"ERROR: unknown --sweep-params: {', '.join(sorted(unknown))}")
+            sys.exit(1)
+        tasks = sweep_tasks(names, args.sweep_points, seeds)
+        print(f"Sweeping {len(names)} parameters × {args.sweep_points} values × "
+              f"{len(seeds)} seeds ({len(tasks)} points, {args.runs} runs each, "
+              f"workers={args.workers})...")
+        rows = run_grid(tasks, n_runs=args.runs, engine=args.engine,
+                        workers=args.workers, out=args.out)
+        print_seed_distribution(rows)
+        print_sweep(rows)
+        if args.out:
+            print(f"\nWrote {args.out}")
+        return
+
+    if args.eval and args.seeds > 1:
+        print(f"Evaluating current game parameters over {args.seeds} seeds...")
+        rows = run_grid(sweep_tasks([], 0, seeds), n_runs=args.runs, engine=args.engine,
+                        workers=args.workers, out=args.out)
+        print_seed_distribution(rows)
+        if args.out:
+            print(f"\nWrote {args.out}")
+        return
+
     if args.eval:
         print("Evaluating current game parameters...")
         p = Params()
-        evaluate_params(p, n_runs=args.runs, years=20, seed=99, verbose=True)
+        profile = PhaseProfiler() if args.profile else None
+        evaluate_params(p, n_runs=args.runs, years=20, seed=EVAL_SEED, verbose=True,
+                        engine=args.engine, profile=profile)
+        if profile:
+            profile.report()
+        return
+
+    if args.parity:
+        ok = run_parity(n_runs=args.parity_runs)
+        print(f"\nParity {'OK' if ok else 'FAILED: game.js and the Python port have drifted'}")
+        sys.exit(0 if ok else 1)
+
+    if args.bench:
+        print("Benchmarking simulate_game / simulate_batch / evaluate_params...")
+        report = run_benchmarks()
+        if args.bench_out:
+            args.bench_out.write_text(json.dumps(report, indent=2))
+            print(f"\nWrote {args.bench_out}")
         return
 
     if args.apply:
@@ -699,8 +2228,31 @@ def main():
         apply_to_gamejs(p, js_path)
         return
 
+    if args.pick is not None:
+        try:
+            weights = parse_weights(args.pick)
+        except ValueError as e:
+            parser.error(f"--pick: {e}")
+        best = Params(**pick_from_archive(load_archive(args.archive), weights)['params'])
+        save_data = {name: getattr(best, name) for name, *_ in SEARCH_SPACE}
+        results_path.write_text(json.dumps(save_data, indent=2))
+        print(f"\nSaved picked parameters to {results_path}")
+        return
+
     # Run optimization
-    best = run_optimization(max_iter=args.maxiter, pop_size=args.popsize)
+    config = EvalConfig(n_runs=args.opt_runs, engine=args.engine, race=args.race)
+    if args.pareto:
+        best = run_pareto(generations=args.maxiter, pop_size=args.pareto_pop, config=config,
+                          workers=args.workers, archive=args.archive)
+    elif args.surrogate:
+        best = run_surrogate(budget=args.budget, config=config, workers=args.workers)
+    else:
+        best = run_optimization(max_iter=args.maxiter, pop_size=args.popsize,
+                                config=config,
+                                workers=args.workers,
+                                checkpoint=args.checkpoint,
+                                checkpoint_every=args.checkpoint_every,
+                                resume=args.resume)
     # Save result
     save_data = {name: getattr(best, name) for name, *_ in SEARCH_SPACE}
     results_path.write_text(json.dumps(save_data, indent=2))
@@ -0,0 +1,146 @@
+// ─── Parity driver ──────────────────────────────────────
+// Replays AI reigns through the real makeDecisions / simulateYear from
+// game.js, with Math.random answered from the random tapes used by
+// optimize.py, and prints the per-year state as JSON.  Run it through
+//   python optimize.py --parity
+// which sends the job on stdin and compares the result with the Python port.
+//
+// Job (stdin):  { tapes: [game][year][slot], personalities: [name],
+//                 slots: { U_WEATHER: 0, ... },
+//                 callSites: [[regex, slot, perOccurrence], ...] }
+// Each Math.random call is attributed to the game.js line that caused it
+// (skipping the pick/randInt/jitter helpers); the first callSites regex
+// matching that line names its tape slot.  Draws from unmatched lines are
+// answered by a fixed side generator and reported as 'unmapped' (line ->
+// count); 'read' lists the tape slots that were used.
+
+'use strict';
+var fs = require('fs');
+var path = require('path');
+var vm = require('vm');
+
+var GAME_JS = path.join(__dirname, 'game.js');
+var HELPERS = { pick: 1, randInt: 1, jitter: 1 };
+
+function sourceBlock(lines, start) {
+  // Lines [start, end] holding one top-level declaration: stop where the
+  // brackets opened on `start` close again (strings and comments skipped).
+  var depth = 0, quote = null;
+  for (var i = start; i < lines.length; i++) {
+    var s = lines[i];
+    for (var j = 0; j < s.length; j++) {
+      var c = s[j];
+      if (quote) {
+        if (c === '\\') j++;
+        else if (c === quote) quote = null;
+      } else if (c === '/' && s[j + 1] === '/') break;
+      else if (c === '"' || c === "'" || c === '`') quote = c;
+      else if (c === '{' || c === '[' || c === '(') depth++;
+      else if (c === '}' || c === ']' || c === ')') depth--;
+    }
+    if (depth <= 0) return i;
+  }
+  throw new Error('unbalanced declaration at game.js:' + (start + 1));
+}
+
+function loadGame(context) {
+  var lines = fs.readFileSync(GAME_JS, 'utf8').split('\n');
+  var wanted = /^(const [A-Z_]+ =|function (pick|randInt|buildCost|clamp|getWeatherPool|makeDecisions|simulateYear)\()/;
+  for (var i = 0; i < lines.length; i++) {
+    if (!wanted.test(lines[i])) continue;
+    var end = sourceBlock(lines, i);
+    new vm.Script(lines.slice(i, end + 1).join('\n'), { filename: GAME_JS, lineOffset: i })
+      .runInContext(context);
+    i = end;
+  }
+  return lines;
+}
+
+function mulberry32(seed) {
+  return function() {
+    seed = (seed + 0x6D2B79F5) | 0;
+    var t = Math.imul(seed ^ (seed >>> 15), 1 | seed);
+    t = (t + Math.imul(t ^ (t >>> 7), 61 | t)) ^ t;
+    return ((t ^ (t >>> 14)) >>> 0) / 4294967296;
+  };
+}
+
+function main() {
+  var job = JSON.parse(fs.readFileSync(0, 'utf8'));
+  var side = mulberry32(12345);
+  var draw = null;   // current year's tape row and bookkeeping
+  var frame = /at (?:([\w.$<>]+) )?\(?(.*?):(\d+):\d+\)?$/;
+
+  var sandbox = { Math: Object.create(Math), console: console };
+  sandbox.Math.random = function() {
+    var stack = new Error().stack.split('\n'), line = 0;
+    for (var i = 1; i < stack.length; i++) {
+      var m = frame.exec(stack[i].trim());
+      if (!m || m[2] !== GAME_JS || HELPERS[m[1]]) continue;
+      line = +m[3];
+      break;
+    }
+    var site = siteOf(line);
+    if (!site) {
+      draw.unmapped[line] = (draw.unmapped[line] || 0) + 1;
+      return side();
+    }
+    var n = draw.seen[line] = (draw.seen[line] || 0) + 1;
+    var slot = job.slots[site[1]] + (site[2] ? n - 1 : 0);
+    draw.read[slot] = 1;
+    return draw.row[slot];
+  };
+  var context = vm.createContext(sandbox);
+  var lines = loadGame(context);
+
+  var siteCache = {};
+  function siteOf(line) {
+    if (!(line in siteCache)) {
+      siteCache[line] = null;
+      for (var k = 0; k < job.callSites.length; k++) {
+        if (new RegExp(job.callSites[k][0]).test(lines[line - 1] || '')) {
+          siteCache[line] = job.callSites[k];
+          break;
+        }
+      }
+    }
+    return siteCache[line];
+  }
+
+  // Opening land price, exactly as beginReign rolls it
+  var opening = /landPrice: randInt\((\d+), (\d+)\)/.exec(lines.join('\n'));
+  var run = vm.runInContext(
+    '(function(name, row) {' +
+    '  var pers = PERSONALITIES.filter(function(p) { return p.name === name; })[0];' +
+    '  return { king: { personality: pers }, pool: getWeatherPool(null),' +
+    '    start: { year: 0, population: START_POP, grain: START_GRAIN, acres: START_ACRES,' +
+    '      landPrice: Math.floor(row * (' + opening[2] + ' - ' + opening[1] + ' + 1)) + ' + opening[1] + ',' +
+    '      totalStarved: 0, avgStarvedPct: 0, loyalty: 50, weather: "normal",' +
+    '      buildings: { granary: 0, walls: 0, temple: 0, irrigation: 0 } } };' +
+    '})', context);
+
+  var games = job.tapes.map(function(tape, g) {
+    var setup = run(job.personalities[g], tape[0][job.slots.U_LAND_PRICE]);
+    var st = setup.start, years = [];
+    var unmapped = {}, read = {};
+    for (var y = 1; y < tape.length; y++) {
+      draw = { row: tape[y], seen: {}, unmapped: unmapped, read: read };
+      st.year = y;
+      st.weather = setup.pool[Math.floor(tape[y][job.slots.U_WEATHER] * setup.pool.length)];
+      read[job.slots.U_WEATHER] = 1;
+      var dec = vm.runInContext('makeDecisions', context)(st, setup.king);
+      var r = vm.runInContext('simulateYear', context)(st, dec);
+      years.push({
+        year: y, weather: st.weather, pop: st.population, grain: st.grain,
+        acres: st.acres, loyalty: st.loyalty, land_price: st.landPrice,
+        buildings: [st.buildings.granary, st.buildings.walls, st.buildings.temple, st.buildings.irrigation],
+        impeached: r.impeached,
+      });
+      if (r.impeached) break;
+    }
+    return { years: years, unmapped: unmapped, read: Object.keys(read).map(Number) };
+  });
+  process.stdout.write(JSON.stringify({ games: games }));
+}
+
+main();